@@ -6,25 +6,68 @@ from llama_index.core import (
     SimpleDirectoryReader, 
     VectorStoreIndex
     )
+from rag.embed_cache import CachedEmbedding
+from rag import tracing
+from rag.streaming import DefaultFileReader, iter_file_chunks, windows
+from rag.context import ContextAssembler
+from core import config
 
-# 1. Init the embedding model
-ollama_embedding = OllamaEmbedding("llama3.2", base_url="http://localhost:11434")
-Settings.embed_model = ollama_embedding
-Settings.llm = Ollama("llama3.2")
+# Nothing is built at import time: the models, the index and the query
+# engine are created by the first get_query_engine() call.
+_query_engine = None
 
-# 2. Storrage Context
-storage_context = StorageContext()
 
-# 3. Load documents from a folder
-documents = SimpleDirectoryReader("app/data").load_data()
+def configure_models():
+    tracing.install()
+    # 1. Init the embedding model
+    ollama_embedding = OllamaEmbedding("llama3.2", base_url="http://localhost:11434")
+    if config.EMBED_CACHE_ENABLED:
+        # re-runs only embed chunks that changed since the last run
+        ollama_embedding = CachedEmbedding(ollama_embedding)
+    Settings.embed_model = ollama_embedding
+    Settings.llm = Ollama("llama3.2")
 
-# 4. Add document and Storage to VectorStore
-index = VectorStoreIndex.from_documents(
-    documents
-)
 
-query_engin = index.as_query_engine()
+def build_query_engine(data_dir: str = "app/data", streaming: bool = config.STREAM_INGEST):
+    configure_models()
 
-resp = query_engin.query("Summarize the main topic.")
+    # 2. Storrage Context
+    storage_context = StorageContext.from_defaults()
 
-print(resp)
\ No newline at end of file
+    if streaming:
+        # 3b. Chunk and embed one window at a time instead of loading every document first
+        index = VectorStoreIndex(nodes=[], storage_context=storage_context)
+        for path in SimpleDirectoryReader(data_dir).input_files:
+            chunks = iter_file_chunks(str(path), reader_cls=DefaultFileReader)
+            for window in windows(chunks, config.STREAM_WINDOW_CHUNKS):
+                index.insert_nodes(window)
+        return _as_query_engine(index)
+
+    # 3. Load documents from a folder
+    documents = SimpleDirectoryReader(data_dir).load_data()
+
+    # 4. Add document and Storage to VectorStore
+    index = VectorStoreIndex.from_documents(
+        documents, storage_context=storage_context
+    )
+
+    return _as_query_engine(index)
+
+
+def _as_query_engine(index):
+    # 5. Dedup, trim and token-budget the retrieved chunks before synthesis
+    node_postprocessors = [ContextAssembler()] if config.CONTEXT_ASSEMBLY else []
+    return index.as_query_engine(similarity_top_k=config.RETRIEVAL_TOP_K, node_postprocessors=node_postprocessors)
+
+
+def get_query_engine():
+    global _query_engine
+    if _query_engine is None:
+        _query_engine = build_query_engine()
+    return _query_engine
+
+
+if __name__ == "__main__":
+    resp = get_query_engine().query("Summarize the main topic.")
+
+    print(resp)
@@ -1,7 +1,44 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
+from sqlalchemy import text
+from db.database import engine
+from services.scheduler import scheduler
 
 router = APIRouter()
 
 @router.get("/check")
 def health():
     return {"status": status.HTTP_200_OK}
+
+
+@router.get("/ready")
+def ready(response: Response):
+    """
+    Readiness probe: 503 while the database is unreachable or a model's wait
+    queue is full (new requests for it would be rejected with 429).
+    """
+    checks = {}
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+
+    stats = scheduler.stats()
+    models = {}
+    for model, queue in stats["models"].items():
+        models[model] = {
+            **queue,
+            "slot_utilization": round(queue["running"] / queue["limit"], 3) if queue["limit"] else 1.0,
+            "queue_utilization": round(queue["waiting"] / scheduler.max_queue, 3) if scheduler.max_queue else 1.0,
+            "saturated": queue["waiting"] >= scheduler.max_queue,
+        }
+
+    is_ready = checks["database"] == "ok" and not any(m["saturated"] for m in models.values())
+    if not is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "ready": is_ready,
+        "checks": checks,
+        "llm": {"rejected": stats["rejected"], "expired": stats["expired"], "models": models},
+    }
@@ -1,13 +1,114 @@
-from fastapi import APIRouter, status
-from services.llm_service import chat
-from schema.llms import Question, Answer
+import asyncio
+import json
+from contextlib import aclosing, asynccontextmanager
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from services.llm_service import chat, stream_chat
+from services.response_cache import get_response_cache
+from services.scheduler import Admission, DeadlineExceeded, Overloaded, scheduler
+from services.metrics import stream_disconnects
+from schema.llms import Question
+from core import config
 
 router = APIRouter()
 
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+
+def encode_event(event: dict, format: str) -> str:
+    if format == "sse":
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    return json.dumps(event) + "\n"
+
+
+def get_admission(request: Request) -> Admission:
+    """
+    Build the scheduling ticket for a request.
+
+    Clients identify themselves with `X-Client-Id` (falls back to the peer
+    address), may raise their `X-Priority`, and send the time they are
+    still willing to wait in `X-Request-Timeout` (seconds).
+    """
+    headers = request.headers
+    client_id = headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+    try:
+        priority = int(headers.get("x-priority", 0))
+        timeout = float(headers.get("x-request-timeout", config.LLM_REQUEST_TIMEOUT))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="invalid scheduling headers"
+            )
+    deadline = asyncio.get_running_loop().time() + timeout
+    return Admission(client_id=client_id, priority=priority, deadline=deadline)
+
+
+@asynccontextmanager
+async def admission_errors(admission: Admission):
+    """Turn scheduler rejections into 429 / 504 responses."""
+    try:
+        async with asyncio.timeout_at(admission.deadline):
+            yield
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+            )
+    except (DeadlineExceeded, TimeoutError):
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="request deadline exceeded"
+            )
+
 
 @router.post("/chat")
-def ask_question(query: Question):
-    answer = chat(query=query)
+async def ask_question(query: Question, request: Request):
+    admission = get_admission(request)
+    async with admission_errors(admission):
+        answer = await chat(query=query.question, admission=admission)
     return {"answer": answer}
 
 
+@router.get("/cache/stats")
+def cache_stats():
+    return get_response_cache().stats()
+
+
+@router.get("/scheduler/stats")
+def scheduler_stats():
+    return scheduler.stats()
+
+
+@router.post("/chat/stream")
+async def ask_question_stream(
+    query: Question,
+    request: Request,
+    format: Literal["sse", "ndjson"] = "sse",
+):
+    admission = get_admission(request)
+    stream = stream_chat(query=query.question, admission=admission)
+    # wait for the first event before answering so that a rejection by the
+    # scheduler is still reported as a 429 / 504 status
+    async with admission_errors(admission):
+        try:
+            first = await anext(stream)
+        except BaseException:
+            await stream.aclose()
+            raise
+
+    async def events():
+        # closing the service generator closes the upstream Ollama stream,
+        # so an abandoned request stops generating on the model side too
+        async with aclosing(stream):
+            yield encode_event(first, format)
+            async for event in stream:
+                if await request.is_disconnected():
+                    stream_disconnects.inc(route=request.url.path)
+                    break
+                yield encode_event(event, format)
+
+    return StreamingResponse(
+        events(),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, status, Depends
-from schema.users import UserCreate, UserUpdate
+from fastapi import APIRouter, status, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from schema.users import BulkResult, UserBulkUpdate, UserCreate, UserUpdate, UserRead
 from db.dep import get_db
+from db.database import session_local
 from sqlalchemy.orm import Session
 from crud.users import (
     create_user, 
-    get_user, 
+    get_user_read,
     get_users,
+    iter_users,
     update_user,
-    user_delete
+    user_delete,
+    bulk_create_users,
+    bulk_update_users,
+    bulk_delete_users,
     )
+from services.user_cache import user_cache
 from uuid import UUID
 
 
@@ -20,17 +27,44 @@ def create(user: UserCreate, db: Session = Depends(get_db)):
     return resp
 
 
+@router.get("/cache/stats")
+def user_cache_stats():
+    return user_cache.stats()
+
+
 @router.get("/get/{user_id}")
 def user_get(user_id: UUID, db: Session = Depends(get_db)):
-    resp = get_user(user_id=user_id, db=db)
+    resp = get_user_read(user_id=user_id, db=db)
     return resp
 
 @router.get("/getAll")
-def users_get_all(db: Session = Depends(get_db)):
-    resp = get_users(db=db)
+def users_get_all(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: UUID | None = None,
+    db: Session = Depends(get_db),
+    ):
+    resp = get_users(db=db, limit=limit, after=after)
+    if len(resp) == limit:
+        # pass this back as ?after= to get the next page
+        response.headers["X-Next-Cursor"] = str(resp[-1].id)
     return resp
 
 
+@router.get("/export")
+def users_export(chunk_size: int = Query(1000, ge=1, le=10000)):
+    # the session must outlive the route, so the generator owns it instead of get_db
+    def rows():
+        db = session_local()
+        try:
+            for user in iter_users(db=db, chunk_size=chunk_size):
+                yield UserRead.model_validate(user, from_attributes=True).model_dump_json() + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
 @router.patch("/update/{user_id}")
 def user_update(
     user_id: UUID, 
@@ -45,3 +79,24 @@ def user_update(
 def delete_user(user_id: UUID, db: Session = Depends(get_db)):
     resp = user_delete(user_id=user_id, db=db)
     return resp
+
+
+# Bulk endpoints: one transaction per request, conflicts are reported per item instead of failing the batch
+@router.post("/bulk/create", response_model=BulkResult)
+def bulk_create(users: list[UserCreate], db: Session = Depends(get_db)):
+    return bulk_create_users(db=db, users=users)
+
+
+@router.post("/bulk/upsert", response_model=BulkResult)
+def bulk_upsert(users: list[UserCreate], db: Session = Depends(get_db)):
+    return bulk_create_users(db=db, users=users, upsert=True)
+
+
+@router.patch("/bulk/update", response_model=BulkResult)
+def bulk_update(updates: list[UserBulkUpdate], db: Session = Depends(get_db)):
+    return bulk_update_users(db=db, updates=updates)
+
+
+@router.post("/bulk/delete", response_model=BulkResult)
+def bulk_delete(user_ids: list[UUID], db: Session = Depends(get_db)):
+    return bulk_delete_users(db=db, user_ids=user_ids)
@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from schema.users import BulkResult, UserBulkUpdate, UserCreate, UserUpdate, UserRead
+from db.dep import get_async_db
+from db.database import async_session_local
+from sqlalchemy.ext.asyncio import AsyncSession
+from crud.users_async import (
+    create_user,
+    get_user_read,
+    get_users,
+    iter_users,
+    update_user,
+    user_delete,
+    )
+from crud.users import bulk_create_users, bulk_update_users, bulk_delete_users
+from services.user_cache import user_cache
+from uuid import UUID
+
+# Same routes as users.py on the aiosqlite engine: handlers run on the event loop,
+# not on the threadpool the LLM calls use. Enabled with USERS_ASYNC_DB=1.
+
+router = APIRouter()
+
+@router.post("/create")
+async def create(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    resp = await create_user(db=db, user_create=user)
+    return resp
+
+
+@router.get("/cache/stats")
+async def user_cache_stats():
+    return user_cache.stats()
+
+
+@router.get("/get/{user_id}")
+async def user_get(user_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    resp = await get_user_read(user_id=user_id, db=db)
+    return resp
+
+@router.get("/getAll")
+async def users_get_all(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: UUID | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    ):
+    resp = await get_users(db=db, limit=limit, after=after)
+    if len(resp) == limit:
+        # pass this back as ?after= to get the next page
+        response.headers["X-Next-Cursor"] = str(resp[-1].id)
+    return resp
+
+
+@router.get("/export")
+async def users_export(chunk_size: int = Query(1000, ge=1, le=10000)):
+    async def rows():
+        async with async_session_local() as db:
+            async for user in iter_users(db=db, chunk_size=chunk_size):
+                yield UserRead.model_validate(user, from_attributes=True).model_dump_json() + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+@router.patch("/update/{user_id}")
+async def user_update(
+    user_id: UUID,
+    user_update: UserUpdate,
+    db: AsyncSession = Depends(get_async_db)
+    ):
+    resp = await update_user(db=db, user_id=user_id, user_update=user_update)
+    return resp
+
+
+@router.delete("/delete")
+async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    resp = await user_delete(user_id=user_id, db=db)
+    return resp
+
+
+# Bulk endpoints reuse the sync implementations inside the async session's greenlet
+@router.post("/bulk/create", response_model=BulkResult)
+async def bulk_create(users: list[UserCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: bulk_create_users(db=session, users=users))
+
+
+@router.post("/bulk/upsert", response_model=BulkResult)
+async def bulk_upsert(users: list[UserCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: bulk_create_users(db=session, users=users, upsert=True))
+
+
+@router.patch("/bulk/update", response_model=BulkResult)
+async def bulk_update(updates: list[UserBulkUpdate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: bulk_update_users(db=session, updates=updates))
+
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def bulk_delete(user_ids: list[UUID], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: bulk_delete_users(db=session, user_ids=user_ids))
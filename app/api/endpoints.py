@@ -1,7 +1,14 @@
-from .api_v1 import health, llm, users
+from .api_v1 import health, llm, metrics
 from fastapi import APIRouter
+from core import config
+
+if config.USERS_ASYNC_DB:
+    from .api_v1 import users_async as users
+else:
+    from .api_v1 import users
 
 api_router = APIRouter()
 api_router.include_router(health.router, prefix="/health", tags=["Health"])
+api_router.include_router(metrics.router, tags=["Metrics"])
 api_router.include_router(llm.router, prefix="/llm", tags=["LLM"])
 api_router.include_router(users.router, prefix="/users", tags=["Users"])
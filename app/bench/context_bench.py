@@ -0,0 +1,153 @@
+"""
+Prompt size and end-to-end latency of RAG queries with and without context
+assembly (rag/context.py), on a fixed question set.
+
+The corpus is three revisions of the same product manual, one file per
+topic and revision, so every question retrieves near-duplicate chunks.
+Queries go through `ChromaLlamaIndexer.query` against the fake Ollama
+server, whose `--prefill-delay` charges each prompt token like CPU prompt
+evaluation. Prompt tokens are counted by the server; "fact recall" checks
+that the sentence answering the question still reached the prompt.
+
+    cd app && python -m bench.context_bench --top-k 6 --prefill-delay 0.002
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from bench.fake_ollama import FakeOllamaServer
+from bench.suite import PlainTextReader, percentile
+
+TOPICS = [
+    ("upload", "file upload size"),
+    ("session", "login session timeout"),
+    ("backup", "nightly backup retention"),
+    ("export", "report export rows"),
+    ("webhook", "webhook retry attempts"),
+    ("quota", "storage quota per workspace"),
+    ("invite", "pending invitations per team"),
+    ("rate", "api rate requests per minute"),
+]
+FILLER = (
+    "administrators configure settings dashboard users workspace account policy "
+    "service request default value changes apply immediately audit history support "
+    "documentation page section option feature billing plan enterprise standard"
+).split()
+
+
+def topic_text(name: str, subject: str, revision: int, rng: random.Random) -> tuple[str, str]:
+    """One manual section; returns (text, the sentence that answers the question)."""
+    fact = f"The {subject} limit is {100 + 7 * len(name)} units."
+    sentences = [f"{name.capitalize()} settings, revision {revision}."]
+    for i in range(12):
+        words = rng.sample(FILLER, 9) + subject.split()[: 1 + i % 2]
+        rng.shuffle(words)
+        sentences.append(" ".join(words).capitalize() + ".")
+    sentences.insert(5, fact)
+    if revision > 1:
+        sentences.append(f"Revision {revision} clarified the {name} wording.")
+    return " ".join(sentences), fact
+
+
+def write_corpus(path: str, revisions: int = 3, seed: int = 0) -> dict:
+    facts = {}
+    for name, subject in TOPICS:
+        for revision in range(1, revisions + 1):
+            rng = random.Random(f"{seed}-{name}")  # same filler in every revision: near-duplicates
+            text, facts[name] = topic_text(name, subject, revision, rng)
+            with open(os.path.join(path, f"{name}-r{revision}.txt"), "w") as f:
+                f.write(text)
+    return facts
+
+
+def run_mode(indexer, server, questions, rounds: int) -> dict:
+    from rag.query_cache import QueryCache
+
+    indexer.query_cache = QueryCache()  # same cold start for both modes
+    indexer._swap_query_engine()
+    latencies, recalled = [], 0
+    before = server.requests.get("prompt_tokens", 0)
+    for round_ in range(rounds):
+        for name, question, fact in questions:
+            start = time.perf_counter()
+            response = indexer.query(question)
+            latencies.append(time.perf_counter() - start)
+            if round_ == 0:
+                recalled += any(fact in n.node.get_content() for n in response.source_nodes)
+    queries = len(questions) * rounds
+    return {
+        "prompt_tokens_per_query": (server.requests.get("prompt_tokens", 0) - before) / queries,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(sorted(latencies), 0.5) * 1000,
+        "p95_ms": percentile(sorted(latencies), 0.95) * 1000,
+        "fact_recall": recalled / len(questions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser("Context assembly benchmark")
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--prefill-delay", type=float, default=0.002, help="fake server seconds per prompt token")
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--max-tokens", type=int, default=1500, help="CONTEXT_MAX_TOKENS")
+    parser.add_argument("--sentence-keep", type=float, default=0.6, help="CONTEXT_SENTENCE_KEEP")
+    parser.add_argument("--trim-min-tokens", type=int, default=128, help="CONTEXT_TRIM_MIN_TOKENS")
+    parser.add_argument("--dedup-threshold", type=float, default=0.95, help="CONTEXT_DEDUP_THRESHOLD")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="context-bench-")
+    os.environ["EMBED_CACHE_DIR"] = os.path.join(workdir, "embed_cache")
+    docs = os.path.join(workdir, "docs")
+    os.makedirs(docs)
+    facts = write_corpus(docs)
+    questions = [(name, f"What is the {subject} limit?", facts[name]) for name, subject in TOPICS]
+
+    server = FakeOllamaServer(
+        token_delay=args.token_delay, prefill_delay=args.prefill_delay, embed_dim=384
+    ).start()
+    try:
+        from rag.context import ContextAssembler
+        from vectordb import ChromaLlamaIndexer
+
+        indexer = ChromaLlamaIndexer(
+            llm_model="fake", chroma_dir=os.path.join(workdir, "store"), collection_name="bench",
+            vector_backend="mmap", base_url=server.base_url, reader_cls=PlainTextReader,
+            similarity_top_k=args.top_k,
+        )
+        indexer.build_index(docs)
+        assembler = ContextAssembler(
+            embed_model=indexer.embedding_model,
+            max_tokens=args.max_tokens,
+            sentence_keep=args.sentence_keep,
+            dedup_threshold=args.dedup_threshold,
+            trim_min_tokens=args.trim_min_tokens,
+        )
+
+        results = {}
+        for mode, postprocessor in (("verbatim", None), ("assembled", assembler)):
+            indexer.context_assembler = postprocessor
+            results[mode] = run_mode(indexer, server, questions, args.rounds)
+            r = results[mode]
+            print(
+                f"[bench] {mode:<9} prompt_tokens/query={r['prompt_tokens_per_query']:7.1f}  "
+                f"mean={r['mean_ms']:7.1f} ms  p50={r['p50_ms']:7.1f} ms  p95={r['p95_ms']:7.1f} ms  "
+                f"fact_recall={r['fact_recall']:.2f}"
+            )
+
+        base, new = results["verbatim"], results["assembled"]
+        saved = 1 - new["prompt_tokens_per_query"] / base["prompt_tokens_per_query"]
+        print(
+            f"[bench] prompt tokens -{saved:.1%}, mean latency {new['mean_ms'] - base['mean_ms']:+.1f} ms "
+            f"({new['mean_ms'] / base['mean_ms'] - 1:+.1%}); assembler {assembler.stats()}"
+        )
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Sync vs. async /users handlers under a mixed read/write load.
+
+Both routers run in-process over ASGI against the same tuned SQLite file
+(WAL, synchronous=NORMAL, mmap, busy_timeout). `--busy-threads` keeps that
+many threadpool workers blocked, the way in-flight sync LLM calls would,
+which is where the sync handlers start queueing.
+
+    cd app && python -m bench.db_bench --requests 4000 --concurrency 64 --busy-threads 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="db-bench-"), "bench.db"))
+
+import anyio
+import httpx
+from fastapi import FastAPI
+from api.api_v1 import users, users_async
+from db.database import engine, dispose_async_engine
+from models.users import Base
+
+
+def make_app(router) -> FastAPI:
+    app = FastAPI()
+    app.include_router(router, prefix="/users")
+    return app
+
+
+async def seed(client: httpx.AsyncClient, label: str, n: int) -> list[str]:
+    body = [{"name": f"seed{i}", "email": f"{label}-seed{i}@bench.io"} for i in range(n)]
+    resp = await client.post("/users/bulk/create", json=body)
+    return [str(user_id) for user_id in resp.json()["created"]]
+
+
+async def run(app: FastAPI, label: str, args) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        ids = await seed(client, label, args.seed)
+        rng = random.Random(0)
+        latencies: list[float] = []
+        errors = 0
+        counter = iter(range(args.requests))
+
+        async def one(i: int):
+            nonlocal errors
+            roll = rng.random()
+            t0 = time.perf_counter()
+            if roll < args.write_ratio / 2:
+                resp = await client.post(
+                    "/users/create", json={"name": f"{label}{i}", "email": f"{label}{i}@bench.io"}
+                )
+            elif roll < args.write_ratio:
+                resp = await client.patch(f"/users/update/{rng.choice(ids)}", json={"name": f"renamed{i}"})
+            elif roll < args.write_ratio + (1 - args.write_ratio) / 2:
+                resp = await client.get(f"/users/get/{rng.choice(ids)}")
+            else:
+                resp = await client.get("/users/getAll", params={"limit": 20, "after": rng.choice(ids)})
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += resp.status_code >= 400
+
+        async def worker():
+            for i in counter:
+                await one(i)
+
+        async def busy():
+            # stand-ins for blocking LLM calls parked on the default threadpool
+            await anyio.to_thread.run_sync(time.sleep, args.busy_seconds)
+
+        start = time.perf_counter()
+        background = [asyncio.create_task(busy()) for _ in range(args.busy_threads)]
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - start
+        for task in background:
+            task.cancel()
+
+    cuts = statistics.quantiles(latencies, n=100)
+    report = {
+        "mode": label,
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / wall, 1),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+    }
+    print(
+        f"[bench] {label:<5} {report['req_per_s']:>8.1f} req/s  p50 {report['p50_ms']:.1f} ms  "
+        f"p95 {report['p95_ms']:.1f} ms  p99 {report['p99_ms']:.1f} ms  errors {errors}"
+    )
+    return report
+
+
+async def main_async(args):
+    Base.metadata.create_all(bind=engine)
+    await run(make_app(users.router), "sync", args)
+    await run(make_app(users_async.router), "async", args)
+    await dispose_async_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser("Sync vs async users DB benchmark")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=2000, help="users created before the run")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--busy-threads", type=int, default=0)
+    parser.add_argument("--busy-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+    print(f"[bench] database: {os.environ['DATABASE_PATH']}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
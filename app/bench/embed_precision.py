@@ -0,0 +1,159 @@
+"""
+Accuracy vs. speed of the MiniLM embedder's low-precision modes.
+
+Every mode embeds the same fixed sample corpus. Recall@k is measured
+against the fp32 model's own top-k neighbours for a fixed query set, so
+it answers "how many of the chunks fp32 would retrieve do we still get".
+
+    cd app && python -m bench.embed_precision --output bench/results/embed_precision.json
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import time
+import torch
+from embed import MODEL_NAME, MiniLMEmbedder
+
+
+CORPUS = [
+    "The invoice must be paid within thirty days of the delivery date.",
+    "Late payments are charged a monthly interest of one and a half percent.",
+    "Refunds are issued to the original payment method within five business days.",
+    "Customers can cancel a subscription at any time from the billing page.",
+    "The annual plan is billed once per year and includes two free months.",
+    "Our support team answers tickets Monday to Friday between nine and five.",
+    "Urgent incidents can be reported through the on-call phone line.",
+    "Passwords must be at least twelve characters long and contain a digit.",
+    "Two-factor authentication is required for all administrator accounts.",
+    "User sessions expire after thirty minutes of inactivity.",
+    "API keys can be rotated from the developer settings page.",
+    "Rate limits allow one hundred requests per minute per API key.",
+    "Webhooks are retried with exponential backoff for up to twenty-four hours.",
+    "The service stores backups in three geographically separate regions.",
+    "Database snapshots are taken every six hours and kept for thirty days.",
+    "Personal data is encrypted at rest with AES-256.",
+    "All traffic between clients and servers uses TLS 1.2 or newer.",
+    "Employees receive security awareness training every year.",
+    "The office is closed on public holidays and the last week of December.",
+    "New employees get a laptop and an onboarding buddy on their first day.",
+    "Expense reports must be submitted within two weeks with receipts attached.",
+    "Travel bookings above five hundred euros need manager approval.",
+    "Remote work is allowed up to three days per week.",
+    "The cafeteria serves vegetarian options every day.",
+    "Parking spaces are assigned on a first come, first served basis.",
+    "The quarterly report summarizes revenue, costs and customer growth.",
+    "Revenue grew twelve percent compared to the same quarter last year.",
+    "Marketing spend was reduced after the campaign underperformed.",
+    "The product roadmap prioritizes offline mode and faster search.",
+    "Search results are ranked by relevance and recency.",
+    "The mobile app supports dark mode since version four.",
+    "Crash reports are collected anonymously to improve stability.",
+    "Release notes are published on the blog every second Tuesday.",
+    "Beta features can be enabled from the experimental settings tab.",
+    "The warehouse ships orders placed before noon on the same day.",
+    "International shipping takes between five and ten business days.",
+    "Damaged items can be returned free of charge within fourteen days.",
+    "Gift cards never expire and can be combined with discount codes.",
+    "Loyalty points are earned on every purchase and redeemed at checkout.",
+    "Prices include VAT for customers inside the European Union.",
+]
+
+QUERIES = [
+    "When do I have to pay the invoice?",
+    "How do I get my money back?",
+    "What are the password requirements?",
+    "How often are backups made?",
+    "Is my data encrypted?",
+    "Can I work from home?",
+    "How fast is delivery abroad?",
+    "How many API calls can I make?",
+    "What happened to revenue this quarter?",
+    "How do I return a broken product?",
+]
+
+MODES = [
+    {"precision": "fp32"},
+    {"precision": "bf16"},
+    {"precision": "int8"},
+    {"precision": "fp32", "output_dim": 128, "reduction": "truncate"},
+    {"precision": "fp32", "output_dim": 128, "reduction": "pca"},
+    {"precision": "int8", "output_dim": 128, "reduction": "pca"},
+    {"precision": "int8", "output_dim": 64, "reduction": "pca"},
+]
+
+
+def model_bytes(model: torch.nn.Module) -> int:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def top_k(queries: torch.Tensor, corpus: torch.Tensor, k: int) -> list[set[int]]:
+    scores = queries @ corpus.T
+    return [set(row.tolist()) for row in scores.topk(k, dim=1).indices]
+
+
+def run_mode(model_name: str, mode: dict, repeats: int, threads: int | None) -> dict:
+    embedder = MiniLMEmbedder(model_name=model_name, num_threads=threads, **mode).load()
+    if mode.get("reduction") == "pca":
+        embedder.fit_projection(CORPUS)
+    embedder.encode(CORPUS[:4])  # warm-up
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        corpus = embedder.encode(CORPUS)
+        timings.append(time.perf_counter() - start)
+    queries = embedder.encode(QUERIES)
+    seconds = statistics.median(timings)
+    return {
+        "mode": embedder.variant.split("@", 1)[1],
+        "dim": corpus.shape[1],
+        "corpus_s": round(seconds, 4),
+        "texts_per_s": round(len(CORPUS) / seconds, 1),
+        "model_mb": round(model_bytes(embedder.model) / 2**20, 1),
+        "corpus": corpus.float(),
+        "queries": queries.float(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser("MiniLM precision / dimensionality report")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    results = [run_mode(args.model, mode, args.repeats, args.threads) for mode in MODES]
+    reference = results[0]
+    truth = top_k(reference["queries"], reference["corpus"], args.k)
+
+    rows = []
+    for result in results:
+        found = top_k(result["queries"], result["corpus"], args.k)
+        recall = statistics.mean(len(f & t) / args.k for f, t in zip(found, truth))
+        row = {key: value for key, value in result.items() if key not in ("corpus", "queries")}
+        row[f"recall@{args.k}"] = round(recall, 3)
+        row["speedup"] = round(reference["corpus_s"] / result["corpus_s"], 2)
+        if result["dim"] == reference["dim"]:
+            cosine = torch.nn.functional.cosine_similarity(result["corpus"], reference["corpus"])
+            row["cosine_to_fp32"] = round(cosine.mean().item(), 4)
+        rows.append(row)
+        print(
+            f"[bench] {row['mode']:<16} dim={row['dim']:<4} {row['texts_per_s']:>8.1f} texts/s  "
+            f"x{row['speedup']:<5} {row['model_mb']:>6.1f} MB  recall@{args.k}={row[f'recall@{args.k}']:.3f}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model, "k": args.k, "results": rows}, f, indent=2)
+        print(f"[bench] Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
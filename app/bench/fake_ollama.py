@@ -0,0 +1,256 @@
+"""
+Local stand-in for the Ollama HTTP API, used by the benchmarks.
+
+Serves /api/chat, /api/generate, /api/embed, /api/embeddings, /api/show and
+/api/tags with a configurable time-to-first-token and per-token latency, so
+runs are reproducible without a model, a GPU or the network. `prefill_delay`
+adds a cost per prompt token (~4 characters), like prompt evaluation on a CPU.
+
+    python -m bench.fake_ollama --port 11435 --token-delay 0.01
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_REPLY = (
+    "This is a canned answer from the local fake Ollama server used for "
+    "benchmarking the API without a real model."
+)
+
+
+def fake_embedding(text: str, dim: int) -> list[float]:
+    """Deterministic bag-of-words hashing embedding (similar texts -> similar vectors)."""
+    vec = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def _fill_schema(schema: dict) -> dict:
+    """Build an object that validates against a (flat) JSON schema."""
+    values = {"string": "stub", "integer": 1, "number": 1.0, "boolean": True, "array": []}
+    return {
+        name: values.get(prop.get("type"), "stub")
+        for name, prop in schema.get("properties", {}).items()
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeOllamaServer"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload: dict):
+        line = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            return self._send_json({"models": [{"name": "fake", "model": "fake"}]})
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        self.server.count(self.path)
+        body = self._read_json()
+        if self.path == "/api/chat":
+            return self._generate(body, key="message")
+        if self.path == "/api/generate":
+            return self._generate(body, key="response")
+        if self.path == "/api/embed":
+            return self._embed(body)
+        if self.path == "/api/embeddings":
+            time.sleep(self.server.embed_delay)
+            return self._send_json(
+                {"embedding": fake_embedding(body.get("prompt", ""), self.server.embed_dim)}
+            )
+        if self.path == "/api/show":
+            return self._send_json(
+                {"model_info": {"fake.context_length": self.server.context_length}}
+            )
+        self._send_json({"error": "not found"}, status=404)
+
+    def _embed(self, body: dict):
+        inputs = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        time.sleep(self.server.embed_delay * max(len(inputs), 1))
+        self._send_json(
+            {
+                "model": body.get("model"),
+                "embeddings": [fake_embedding(t, self.server.embed_dim) for t in inputs],
+            }
+        )
+
+    def _generate(self, body: dict, key: str):
+        fmt = body.get("format")
+        if isinstance(fmt, dict):
+            text = json.dumps(_fill_schema(fmt))
+        elif fmt == "json":
+            text = json.dumps({"answer": DEFAULT_REPLY})
+        else:
+            text = self.server.reply
+        # whitespace-preserving split so the streamed tokens join back to `text`
+        tokens = re.findall(r"\S+\s*|\s+", text)[: self.server.max_tokens] or [""]
+        model = body.get("model", "fake")
+        prompt = body.get("prompt") or "".join(str(m.get("content") or "") for m in body.get("messages", []))
+        prompt_tokens = len(prompt) // 4 + 1
+        self.server.count("prompt_tokens", prompt_tokens)
+
+        def frame(content: str, done: bool) -> dict:
+            payload = {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "done": done,
+            }
+            if key == "message":
+                payload["message"] = {"role": "assistant", "content": content}
+            else:
+                payload["response"] = content
+            if done:
+                payload.update(
+                    done_reason="stop",
+                    prompt_eval_count=prompt_tokens,
+                    eval_count=len(tokens),
+                )
+            return payload
+
+        time.sleep(self.server.first_token_delay + self.server.prefill_delay * prompt_tokens)
+        if not body.get("stream", True):
+            time.sleep(self.server.token_delay * (len(tokens) - 1))
+            return self._send_json(frame("".join(tokens), done=True))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.server.token_delay)
+                self._send_chunk(frame(token, done=False))
+            self._send_chunk(frame("", done=True))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # client went away mid-stream
+            self.server.count("cancelled")
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        first_token_delay: float = 0.05,
+        token_delay: float = 0.01,
+        max_tokens: int = 64,
+        embed_dim: int = 256,
+        embed_delay: float = 0.0,
+        context_length: int = 4096,
+        reply: str = DEFAULT_REPLY,
+        prefill_delay: float = 0.0,
+    ):
+        super().__init__((host, port), _Handler)
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.max_tokens = max_tokens
+        self.embed_dim = embed_dim
+        self.embed_delay = embed_delay
+        self.context_length = context_length
+        self.reply = reply
+        self.prefill_delay = prefill_delay
+        self.requests: dict[str, int] = {}
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path: str, amount: int = 1):
+        with self._count_lock:
+            self.requests[path] = self.requests.get(path, 0) + amount
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser("Fake Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--embed-dim", type=int, default=256)
+    parser.add_argument("--embed-delay", type=float, default=0.0)
+    parser.add_argument("--prefill-delay", type=float, default=0.0, help="seconds per prompt token")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(
+        host=args.host,
+        port=args.port,
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        max_tokens=args.max_tokens,
+        embed_dim=args.embed_dim,
+        embed_delay=args.embed_delay,
+        prefill_delay=args.prefill_delay,
+    )
+    print(f"[fake-ollama] Listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[fake-ollama] Stopped.")
+
+
+if __name__ == "__main__":
+    main()
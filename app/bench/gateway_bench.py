@@ -0,0 +1,91 @@
+"""
+Compare the old per-request `Ollama(...)` construction (sync, on a worker
+threadpool) with the pooled async `LLMGateway` against the fake Ollama server.
+
+    cd app && python -m bench.gateway_bench --requests 400 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from llama_index.llms.ollama import Ollama
+from bench.fake_ollama import FakeOllamaServer
+from schema.llms import StructuredResponse
+from services.llm_gateway import LLMGateway
+from services.llm_service import messages
+
+# FastAPI / anyio runs sync routes on a 40 thread pool by default
+THREADPOOL_SIZE = 40
+MODEL = "fake"
+
+
+def per_request_chat(base_url: str, query: str):
+    llm = Ollama(model=MODEL, base_url=base_url, request_timeout=120.0)
+    song_resp = llm.as_structured_llm(StructuredResponse)
+    return song_resp.chat(messages=messages(query)).message.content
+
+
+async def run_baseline(base_url: str, n_requests: int, concurrency: int) -> list[float]:
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=THREADPOOL_SIZE)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> float:
+        async with sem:
+            start = time.perf_counter()
+            await loop.run_in_executor(pool, per_request_chat, base_url, f"song {i}")
+            return time.perf_counter() - start
+
+    try:
+        return await asyncio.gather(*(one(i) for i in range(n_requests)))
+    finally:
+        pool.shutdown()
+
+
+async def run_gateway(base_url: str, n_requests: int, concurrency: int) -> list[float]:
+    gateway = LLMGateway(base_url=base_url, max_connections=concurrency)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> float:
+        async with sem:
+            start = time.perf_counter()
+            await gateway.chat(
+                messages(f"song {i}"), output_cls=StructuredResponse, model=MODEL
+            )
+            return time.perf_counter() - start
+
+    try:
+        return await asyncio.gather(*(one(i) for i in range(n_requests)))
+    finally:
+        await gateway.aclose()
+
+
+def report(name: str, latencies: list[float], wall: float, server: FakeOllamaServer):
+    latencies = sorted(latencies)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(
+        f"[bench] {name:<9} {len(latencies) / wall:8.1f} req/s  "
+        f"p50={pct(0.50):7.1f}ms  p95={pct(0.95):7.1f}ms  p99={pct(0.99):7.1f}ms  "
+        f"tcp_connections={server.requests.get('connections', 0)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser("LLM gateway benchmark")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    for name, runner in (("baseline", run_baseline), ("gateway", run_gateway)):
+        with FakeOllamaServer(
+            first_token_delay=args.first_token_delay, token_delay=args.token_delay
+        ) as server:
+            start = time.perf_counter()
+            latencies = asyncio.run(runner(server.base_url, args.requests, args.concurrency))
+            report(name, latencies, time.perf_counter() - start, server)
+
+
+if __name__ == "__main__":
+    main()
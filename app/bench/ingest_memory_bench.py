@@ -0,0 +1,126 @@
+"""
+Peak memory of eager vs. streaming ingestion of one large document.
+
+Each (mode, size) pair runs `ChromaLlamaIndexer.build_index` on a generated
+plain-text file in a fresh interpreter, against the fake Ollama server,
+and records the Python heap peak (tracemalloc), the heap still held once
+the build returns (the index itself, which grows with the chunk count in
+either mode) and the growth of the process's max RSS. The difference,
+peak minus retained, is the ingestion working set: eager grows with the
+file, streaming should stay flat. Exits non-zero when the streaming
+working set grows by more than `--max-growth` between the smallest and
+the largest file.
+
+    cd app && python -m bench.ingest_memory_bench --sizes-mb 5 20
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from bench.fake_ollama import FakeOllamaServer
+
+CHILD = """
+import json, os, resource, sys, time, tracemalloc
+from bench.suite import PlainTextReader
+from vectordb import ChromaLlamaIndexer
+
+path, workdir, base_url, streaming = sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4] == "1"
+indexer = ChromaLlamaIndexer(
+    llm_model="fake", chroma_dir=os.path.join(workdir, "store"), collection_name="bench",
+    vector_backend="mmap", base_url=base_url, reader_cls=PlainTextReader, streaming=streaming,
+)
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tracemalloc.start()
+start = time.perf_counter()
+stats = indexer.build_index(path)
+seconds = time.perf_counter() - start
+retained, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "chunks": stats["embedded"],
+    "seconds": round(seconds, 2),
+    "heap_peak_mb": round(peak / 2**20, 1),
+    "heap_retained_mb": round(retained / 2**20, 1),  # the built index itself
+    "working_set_mb": round((peak - retained) / 2**20, 1),
+    "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),  # ru_maxrss is in KiB on Linux
+}))
+"""
+
+
+def write_document(path: str, size_mb: float, seed: int = 0):
+    """A single large manual: paragraphs of random words, no blank line at the end."""
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(5000)]
+    target = int(size_mb * 2**20)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            paragraph = " ".join(rng.choices(words, k=120)) + ".\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+
+
+def run(path: str, base_url: str, streaming: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix="ingest-mem-")
+    try:
+        env = dict(os.environ, EMBED_CACHE_ENABLED="0")
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD, path, workdir, base_url, "1" if streaming else "0"],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr[-2000:])
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser("Ingestion memory benchmark")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[5, 20])
+    parser.add_argument("--modes", nargs="+", choices=("eager", "streaming"), default=["eager", "streaming"])
+    parser.add_argument("--max-growth", type=float, default=1.5, help="allowed streaming working-set ratio, largest/smallest")
+    parser.add_argument("--output", default=None, help="write the results as JSON")
+    args = parser.parse_args()
+
+    docs = tempfile.mkdtemp(prefix="ingest-docs-")
+    results = []
+    with FakeOllamaServer(embed_dim=384) as server:
+        try:
+            for size in sorted(args.sizes_mb):
+                path = os.path.join(docs, f"manual-{size:g}mb.txt")
+                write_document(path, size)
+                for mode in args.modes:
+                    result = {"mode": mode, "size_mb": size, **run(path, server.base_url, mode == "streaming")}
+                    results.append(result)
+                    print(
+                        f"[bench] {mode:<9} {size:6.1f} MB  chunks={result['chunks']:6d}  "
+                        f"heap_peak={result['heap_peak_mb']:7.1f} MB  working_set={result['working_set_mb']:7.1f} MB  rss_growth={result['rss_growth_mb']:7.1f} MB  "
+                        f"{result['seconds']:6.1f} s"
+                    )
+                os.remove(path)
+        finally:
+            shutil.rmtree(docs, ignore_errors=True)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    streaming = [r for r in results if r["mode"] == "streaming"]
+    if len(streaming) >= 2:
+        growth = streaming[-1]["working_set_mb"] / max(streaming[0]["working_set_mb"], 0.1)
+        size_ratio = streaming[-1]["size_mb"] / streaming[0]["size_mb"]
+        print(f"[bench] streaming working set grew {growth:.2f}x for a {size_ratio:.1f}x larger document")
+        if growth > args.max_growth:
+            print(f"[bench] FAIL: streaming working set should not depend on the document size (limit {args.max_growth}x)")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
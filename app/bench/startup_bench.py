@@ -0,0 +1,117 @@
+"""
+Cold-start budget check for the API.
+
+Imports `main` in fresh interpreters under `-X importtime`, measures the
+time until the lifespan startup has run, and lists the slowest modules.
+Exits non-zero when the median import time goes over the budget or when
+one of the heavy libraries (llama_index, torch, ...) is imported eagerly,
+so it can run in CI.
+
+    cd app && python -m bench.startup_bench --runs 5 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from core import config
+
+# must only be imported on first use, never while the app boots
+LAZY_MODULES = ("llama_index", "torch", "transformers", "chromadb", "ollama", "numpy", "watchdog")
+
+STARTUP_SCRIPT = """
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({
+    "import_ms": (imported - t0) * 1000,
+    "ready_ms": (ready - t0) * 1000,
+    "eager": sorted({name.split(".")[0] for name in sys.modules} & set(%r)),
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every line of `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_once(env: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT % (LAZY_MODULES,)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+    result["importtime_ms"] = next(cum for name, _, cum in rows if name.strip() == "main") / 1000
+    result["modules"] = rows
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser("Import-time / startup budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=config.STARTUP_IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ, STARTUP_WARMUP="0")
+    env.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="startup-bench-"), "bench.db"))
+    runs = [run_once(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    ready_ms = statistics.median(run["ready_ms"] for run in runs)
+    eager = sorted({name for run in runs for name in run["eager"]})
+    slowest = sorted(runs[-1]["modules"], key=lambda row: row[1], reverse=True)[: args.top]
+
+    print(f"[startup] import main: {import_ms:.0f} ms (median of {args.runs}), ready after lifespan: {ready_ms:.0f} ms")
+    print(f"[startup] -X importtime total for main: {statistics.median(r['importtime_ms'] for r in runs):.0f} ms")
+    for name, self_us, cumulative_us in slowest:
+        print(f"[startup]   {self_us / 1000:7.1f} ms self {cumulative_us / 1000:8.1f} ms cum  {name.strip()}")
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import took {import_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"imported eagerly at startup: {', '.join(eager)}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({
+                "import_ms": round(import_ms, 1),
+                "ready_ms": round(ready_ms, 1),
+                "budget_ms": args.budget_ms,
+                "eager": eager,
+                "slowest": [
+                    {"module": name.strip(), "self_ms": self_us / 1000, "cumulative_ms": cum / 1000}
+                    for name, self_us, cum in slowest
+                ],
+                "failures": failures,
+            }, f, indent=2)
+
+    if failures:
+        for failure in failures:
+            print(f"[startup] FAIL: {failure}")
+        sys.exit(1)
+    print(f"[startup] OK: within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
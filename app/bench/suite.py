@@ -0,0 +1,402 @@
+"""
+End-to-end benchmark suite against the local fake Ollama server.
+
+Runs load scenarios for the HTTP API (`/llm/chat`, `/llm/chat/stream`,
+`/users/*`, served in-process over ASGI), `ChromaLlamaIndexer.build_index` /
+`query` and `GitCommitWorkflow`, and writes p50/p95/p99 latency and
+throughput per scenario to a JSON report. Everything runs on localhost with
+fixed seeds and fixed fake-model timings, so two reports taken on the same
+machine can be compared across commits:
+
+    cd app && python -m bench.suite                       # all scenarios
+    cd app && python -m bench.suite --only users llm --requests 500
+    cd app && python -m bench.suite --compare bench/results/<old>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from bench.fake_ollama import FakeOllamaServer
+
+SCENARIOS = ("llm", "users", "indexer", "git")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+MODEL = "fake"
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def summarize(name: str, latencies: list[float], wall: float, errors: int = 0, **extra) -> dict:
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    result = {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall > 0 else None,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "mean": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+            "max": ms(latencies[-1]) if latencies else 0.0,
+        },
+    }
+    result.update(extra)
+    latency = result["latency_ms"]
+    print(
+        f"[bench] {name:<30} {result['requests']:6d} req  {result['throughput_rps'] or 0:8.1f} req/s  "
+        f"p50={latency['p50']:8.1f}ms  p95={latency['p95']:8.1f}ms  p99={latency['p99']:8.1f}ms  "
+        f"errors={errors}"
+    )
+    return result
+
+
+async def run_load(name: str, make_call, n_requests: int, concurrency: int, **extra) -> dict:
+    """Run `await make_call(i)` n_requests times, at most `concurrency` at once."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                await make_call(i)
+            except Exception as e:
+                errors += 1
+                if errors == 1:
+                    print(f"[bench] {name}: first error: {e!r}")
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    return summarize(name, latencies, time.perf_counter() - start, errors, concurrency=concurrency, **extra)
+
+
+def check(response, expected: int = 200):
+    if response.status_code != expected:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path} -> {response.status_code}")
+    return response
+
+
+# ---------------------------------------------------------------- HTTP API --
+
+async def api_scenarios(which: set[str], args) -> list[dict]:
+    import httpx
+    import main  # imported late: config reads the environment set up in `prepare_env`
+
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if "llm" in which:
+                results += await llm_scenarios(client, args)
+            if "users" in which:
+                results += await user_scenarios(client, args)
+    return results
+
+
+async def llm_scenarios(client, args) -> list[dict]:
+    # distinct questions: the response cache is off anyway, and single-flight must not merge them
+    chat = await run_load(
+        "llm.chat",
+        lambda i: _post_checked(client, "/llm/chat", {"question": f"question number {i}"}),
+        args.requests,
+        args.concurrency,
+    )
+
+    ttfts = []
+
+    async def stream(i: int):
+        response = check(await client.post(
+            "/llm/chat/stream", params={"format": "ndjson"}, json={"question": f"stream question {i}"}
+        ))
+        done = json.loads(response.text.strip().splitlines()[-1])
+        ttfts.append(done["ttft_ms"])
+
+    streamed = await run_load("llm.chat_stream", stream, args.requests, args.concurrency)
+    ttfts.sort()
+    streamed["ttft_ms"] = {"p50": percentile(ttfts, 0.50), "p95": percentile(ttfts, 0.95), "p99": percentile(ttfts, 0.99)}
+    return [chat, streamed]
+
+
+async def _post_checked(client, path: str, body: dict):
+    return check(await client.post(path, json=body))
+
+
+async def user_scenarios(client, args) -> list[dict]:
+    rng = random.Random(args.seed)
+    n = args.requests
+    ids: list[str] = []
+
+    async def create(i: int):
+        response = check(await client.post(
+            "/users/create", json={"name": f"user {i}", "email": f"bench{i}@example.com"}
+        ))
+        ids.append(response.json()["id"])
+
+    async def get(i: int):
+        check(await client.get(f"/users/get/{rng.choice(ids)}"))
+
+    async def page(i: int):
+        check(await client.get("/users/getAll", params={"limit": 50}))
+
+    async def update(i: int):
+        check(await client.patch(f"/users/update/{ids[i % len(ids)]}", json={"name": f"renamed {i}"}))
+
+    async def delete(i: int):
+        check(await client.delete("/users/delete", params={"user_id": ids[i]}))
+
+    results = [await run_load("users.create", create, n, args.concurrency)]
+    ids.sort()  # completion order depends on scheduling; keep the read mix reproducible
+    results.append(await run_load("users.get", get, n, args.concurrency))
+    results.append(await run_load("users.list", page, max(n // 5, 1), args.concurrency))
+    results.append(await run_load("users.update", update, n, args.concurrency))
+    results.append(await run_load("users.delete", delete, len(ids), args.concurrency))
+    return results
+
+
+# ----------------------------------------------------------------- indexer --
+
+class PlainTextReader:
+    """Reads files as plain text, so the run measures chunking, embedding and storage, not parsing."""
+
+    def load_data(self, file, extra_info=None):
+        from llama_index.core import Document
+
+        with open(file, encoding="utf-8") as f:
+            return [Document(text=f.read(), metadata={"file_path": str(file)})]
+
+
+def write_corpus(folder: str, files: int, paragraphs: int, seed: int):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(2000)]
+    os.makedirs(folder, exist_ok=True)
+    for n in range(files):
+        with open(os.path.join(folder, f"doc{n:04d}.txt"), "w", encoding="utf-8") as f:
+            for _ in range(paragraphs):
+                f.write(" ".join(rng.choices(words, k=80)) + ".\n\n")
+
+
+def indexer_scenarios(server: FakeOllamaServer, args, workdir: str) -> list[dict]:
+    from llama_index.readers.file import UnstructuredReader
+    from vectordb import ChromaLlamaIndexer
+
+    data = os.path.join(workdir, "corpus")
+    write_corpus(data, args.index_files, args.index_paragraphs, args.seed)
+    reader = UnstructuredReader if args.reader == "unstructured" else PlainTextReader
+
+    results = []
+    for backend in args.vector_backends:
+        indexer = ChromaLlamaIndexer(
+            llm_model=MODEL,
+            chroma_dir=os.path.join(workdir, f"store-{backend}"),
+            collection_name="bench",
+            vector_backend=backend,
+            base_url=server.base_url,
+            reader_cls=reader,
+        )
+        start = time.perf_counter()
+        stats = indexer.build_index(data)
+        build = time.perf_counter() - start
+        results.append(summarize(
+            f"indexer.build[{backend}]", [build], build,
+            files=args.index_files, chunks=stats["embedded"],
+            chunks_per_s=round(stats["embedded"] / build, 1) if build > 0 else None,
+        ))
+
+        start = time.perf_counter()
+        indexer.build_index(data)
+        resync = time.perf_counter() - start
+        results.append(summarize(f"indexer.resync[{backend}]", [resync], resync))
+
+        rng = random.Random(args.seed)
+        questions = [f"what is said about term{rng.randrange(2000)}?" for _ in range(args.queries)]
+        for label, batch in (("cold", questions), ("repeat", questions)):
+            latencies = []
+            start = time.perf_counter()
+            for question in batch:
+                t0 = time.perf_counter()
+                indexer.query(question)
+                latencies.append(time.perf_counter() - t0)
+            results.append(summarize(f"indexer.query_{label}[{backend}]", latencies, time.perf_counter() - start))
+    return results
+
+
+# --------------------------------------------------------------- git agent --
+
+def git(repo: str, *cmd: str) -> str:
+    return subprocess.check_output(["git", *cmd], cwd=repo, stderr=subprocess.DEVNULL).decode()
+
+
+def git_scenario(server: FakeOllamaServer, args, workdir: str) -> list[dict]:
+    from git_agent import GitCommitWorkflow
+
+    repo = os.path.join(workdir, "repo")
+    os.makedirs(repo)
+    git(repo, "init", "-q")
+    git(repo, "config", "user.name", "bench")
+    git(repo, "config", "user.email", "bench@example.com")
+    rng = random.Random(args.seed)
+    for n in range(args.git_files):
+        with open(os.path.join(repo, f"module{n}.py"), "w") as f:
+            f.write("".join(f"value_{n}_{i} = {i}\n" for i in range(200)))
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "initial")
+
+    workflow = GitCommitWorkflow(
+        model_name=MODEL, base_url=server.base_url, repo_root=repo, max_prompt_tokens=args.git_prompt_tokens
+    )
+
+    async def run_commits() -> list[float]:
+        latencies = []
+        for round_ in range(args.git_commits):
+            for n in rng.sample(range(args.git_files), k=min(3, args.git_files)):
+                with open(os.path.join(repo, f"module{n}.py"), "a") as f:
+                    f.write("".join(f"added_{round_}_{i} = {rng.random()!r}\n" for i in range(args.git_lines)))
+            start = time.perf_counter()
+            await workflow.run()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run_commits())
+    commits = int(git(repo, "rev-list", "--count", "HEAD")) - 1
+    return [summarize("git.commit_workflow", latencies, time.perf_counter() - start, commits=commits)]
+
+
+# ------------------------------------------------------------------ driver --
+
+def prepare_env(server: FakeOllamaServer, workdir: str):
+    """Point the app at the fake server and at throwaway databases, before anything imports `core.config`."""
+    os.environ.update(
+        OLLAMA_BASE_URL=server.base_url,
+        CHAT_MODEL=MODEL,
+        EMBED_MODEL=MODEL,
+        DATABASE_PATH=os.path.join(workdir, "users.db"),
+        RESPONSE_CACHE_ENABLED="0",
+        EMBED_CACHE_ENABLED="0",
+        STARTUP_WARMUP="0",
+        # admission control is measured separately (gateway_bench); don't let it reject bench load
+        LLM_MAX_QUEUE="100000",
+    )
+
+
+def environment() -> dict:
+    def run(*cmd):
+        try:
+            return subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": run("git", "rev-parse", "--short", "HEAD"),
+        "dirty": bool(run("git", "status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare(report: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    print(f"[bench] vs {baseline_path} (commit {report['environment']['commit']} against the baseline)")
+    for result in report["results"]:
+        old = baseline.get(result["scenario"])
+        if old is None:
+            continue
+        change = lambda new, prev: f"{(new - prev) / prev * 100:+6.1f}%" if prev else "   n/a"
+        print(
+            f"[bench]   {result['scenario']:<28} "
+            f"p50 {change(result['latency_ms']['p50'], old['latency_ms']['p50'])}  "
+            f"p95 {change(result['latency_ms']['p95'], old['latency_ms']['p95'])}  "
+            f"p99 {change(result['latency_ms']['p99'], old['latency_ms']['p99'])}  "
+            f"throughput {change(result['throughput_rps'] or 0, old['throughput_rps'] or 0)}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser("Benchmark suite (fake Ollama, no network or GPU)")
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--embed-delay", type=float, default=0.001, help="seconds per embedded text")
+    parser.add_argument("--index-files", type=int, default=50)
+    parser.add_argument("--index-paragraphs", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--vector-backends", nargs="+", choices=("chroma", "mmap"), default=["chroma", "mmap"])
+    parser.add_argument("--reader", choices=("plain", "unstructured"), default="plain")
+    parser.add_argument("--git-files", type=int, default=20)
+    parser.add_argument("--git-commits", type=int, default=10)
+    parser.add_argument("--git-lines", type=int, default=40)
+    parser.add_argument("--git-prompt-tokens", type=int, default=3000, help="lower it to exercise map-reduce")
+    parser.add_argument("--output", default=None, help="report path (default: bench/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier report to diff against")
+    args = parser.parse_args()
+
+    which = set(args.only)
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    server = FakeOllamaServer(
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        max_tokens=args.max_tokens,
+        embed_delay=args.embed_delay,
+    ).start()
+    prepare_env(server, workdir)
+    print(f"[bench] Fake Ollama on {server.base_url}, scratch dir {workdir}")
+
+    results = []
+    try:
+        if which & {"llm", "users"}:
+            results += asyncio.run(api_scenarios(which, args))
+        if "indexer" in which:
+            results += indexer_scenarios(server, args, workdir)
+        if "git" in which:
+            results += git_scenario(server, args, workdir)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "environment": environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "fake_ollama_requests": server.requests,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['environment']['commit'] or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[bench] Report written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    if any(result["errors"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
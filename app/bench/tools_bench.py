@@ -0,0 +1,129 @@
+"""
+Agent tool latency against a local stub weather server: the old blocking
+`requests.get` per call, the pooled async client one call at a time,
+`run_tools` fanning the calls out concurrently, and repeated lookups served
+by the tool cache.
+
+    cd app && python -m bench.tools_bench --cities 20 --delay 0.1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1  # send headers and body in one segment (no Nagle / delayed-ACK stall on keep-alive)
+    server: "StubWeatherServer"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count("requests")
+        time.sleep(self.server.delay)
+        city = unquote(urlsplit(self.path).path.strip("/"))
+        body = f"{city}: +{len(city) % 30}°C".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubWeatherServer(ThreadingHTTPServer):
+    """Answers `GET /<city>?format=3` like wttr.in after `delay` seconds."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.1):
+        super().__init__((host, port), _Handler)
+        self.delay = delay
+        self.counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def report(name: str, wall: float, calls: int, server: StubWeatherServer, before: dict):
+    delta = {k: server.counts.get(k, 0) - before.get(k, 0) for k in ("requests", "connections")}
+    print(
+        f"[bench] {name:<26} {wall * 1000:8.1f} ms for {calls} calls  "
+        f"http_requests={delta['requests']}  new_connections={delta['connections']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser("Agent tool benchmark")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.1, help="stub server latency per request")
+    args = parser.parse_args()
+
+    with StubWeatherServer(delay=args.delay) as server:
+        os.environ["WEATHER_API_URL"] = server.base_url
+        import requests
+        import function_calling as fc  # imported late: config reads WEATHER_API_URL
+        from services.tool_cache import tool_cache
+
+        cities = [f"City {i}" for i in range(args.cities)]
+
+        before = dict(server.counts)
+        start = time.perf_counter()
+        for city in cities:
+            requests.get(url=f"{server.base_url}/{city}?format=3")
+        report("blocking requests.get", time.perf_counter() - start, len(cities), server, before)
+
+        async def scenarios():
+            before = dict(server.counts)
+            start = time.perf_counter()
+            for city in cities:
+                await fc.fetch_weather.__wrapped__(city=city)  # bypass the cache
+            report("pooled client, one by one", time.perf_counter() - start, len(cities), server, before)
+
+            tool_cache.clear()
+            calls = [{"tool": "weather_today", "args": {"city_name": city}} for city in cities]
+            before = dict(server.counts)
+            start = time.perf_counter()
+            results = await fc.run_tools(calls)
+            report("run_tools (parallel)", time.perf_counter() - start, len(cities), server, before)
+            assert not any(str(r).startswith("error") for r in results), results
+
+            before = dict(server.counts)
+            latencies = []
+            for city in cities:
+                t0 = time.perf_counter()
+                await fc.weather_today(city_name=f"  {city.upper()} ")
+                latencies.append(time.perf_counter() - t0)
+            report("cached repeat lookups", sum(latencies), len(cities), server, before)
+            print(f"[bench]   median cached lookup {statistics.median(latencies) * 1e6:.0f} us, cache {tool_cache.stats()}")
+            await fc.aclose_tools()
+
+        asyncio.run(scenarios())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Query latency of Chroma vs. the memory-mapped NumPy store (brute force and IVF)
+on the same synthetic clustered corpus, plus IVF recall against brute force.
+
+    cd app && python -m bench.vector_store_bench --rows 50000 --dim 384
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import chromadb
+import numpy as np
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from rag.mmap_store import MmapVectorStore
+
+
+def corpus(rows: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(rows // 500, 8), dim))
+    return (centers[rng.integers(len(centers), size=rows)] + 0.7 * rng.normal(size=(rows, dim))).astype(np.float32)
+
+
+def fill(store, vectors: np.ndarray, batch: int = 5000):
+    for start in range(0, len(vectors), batch):
+        store.add([
+            TextNode(id_=f"n{i}", text=f"chunk {i}", embedding=vectors[i].tolist())
+            for i in range(start, min(start + batch, len(vectors)))
+        ])
+
+
+def timed_queries(store, queries: np.ndarray, k: int) -> tuple[list[list[str]], list[float]]:
+    ids, latencies = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        result = store.query(VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=k))
+        latencies.append((time.perf_counter() - t0) * 1000)
+        ids.append(result.ids)
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser("Vector store query benchmark")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ivf-lists", type=int, default=128)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--skip-chroma", action="store_true")
+    args = parser.parse_args()
+
+    vectors = corpus(args.rows, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(args.rows, size=args.queries)] + 0.3 * rng.normal(size=(args.queries, args.dim))
+    workdir = tempfile.mkdtemp(prefix="vector-bench-")
+    try:
+        stores = {}
+        if not args.skip_chroma:
+            client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"))
+            collection = client.get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+            stores["chroma"] = ChromaVectorStore(chroma_collection=collection)
+        stores["mmap"] = MmapVectorStore(os.path.join(workdir, "mmap"), dtype=args.dtype)
+        stores["mmap-ivf"] = MmapVectorStore(
+            os.path.join(workdir, "ivf"), dtype=args.dtype, ivf_lists=args.ivf_lists, nprobe=args.nprobe
+        )
+
+        results = {}
+        for name, store in stores.items():
+            t0 = time.perf_counter()
+            fill(store, vectors)
+            build = time.perf_counter() - t0
+            results[name] = (build, *timed_queries(store, queries, args.k))
+
+        exact = results["mmap"][1]  # brute force is exact
+        for name, (build, ids, latencies) in results.items():
+            cuts = statistics.quantiles(latencies, n=100)
+            recall = statistics.mean(len(set(found) & set(truth)) / args.k for found, truth in zip(ids, exact))
+            print(
+                f"[bench] {name:<9} build {build:6.1f}s  p50 {cuts[49]:7.2f} ms  p95 {cuts[94]:7.2f} ms  "
+                f"recall@{args.k} vs brute force {recall:.3f}"
+            )
+
+        t0 = time.perf_counter()
+        MmapVectorStore(os.path.join(workdir, "mmap"), read_only=True)
+        print(f"[bench] mmap open (read-only, {args.rows} rows): {(time.perf_counter() - t0) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# Ollama backend
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+CHAT_MODEL = os.getenv("CHAT_MODEL", "deepseek-r1:1.5b")
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120.0"))
+
+# keep-alive HTTP pool kept open per model by the LLM gateway
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60.0"))
+
+# embedding model used for semantic lookups
+EMBED_MODEL = os.getenv("EMBED_MODEL", "llama3.2")
+
+# /llm/chat response cache
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "./response_cache.db")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+# cosine similarity needed to reuse a near-identical question's answer, 0 disables
+RESPONSE_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0"))
+
+# admission control in front of Ollama
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+# per-model overrides, e.g. "deepseek-r1:1.5b=2,llama3.2=4"
+LLM_MODEL_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, _, limit in (
+        item.rpartition("=") for item in os.getenv("LLM_MODEL_CONCURRENCY", "").split(",") if item
+    )
+}
+
+# persistent embedding cache shared by every ingestion path
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "./embed_cache")
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16")
+
+# in-process MiniLM embedder (embed.py)
+MINILM_PRECISION = os.getenv("MINILM_PRECISION", "fp32")  # fp32 | int8 | bf16
+MINILM_OUTPUT_DIM = int(os.getenv("MINILM_OUTPUT_DIM", "0")) or None
+MINILM_REDUCTION = os.getenv("MINILM_REDUCTION", "truncate")  # truncate | pca
+MINILM_PROJECTION_PATH = os.getenv("MINILM_PROJECTION_PATH") or None  # MiniLMEmbedder.save_projection output, for pca
+MINILM_THREADS = int(os.getenv("MINILM_THREADS", "0")) or None
+MINILM_MAX_BATCH_SIZE = int(os.getenv("MINILM_MAX_BATCH_SIZE", "32"))  # texts per micro-batch
+MINILM_BUCKET_SIZE = int(os.getenv("MINILM_BUCKET_SIZE", "8"))  # texts per padded forward pass
+
+# in-process memory-mapped vector store (ChromaLlamaIndexer(vector_backend="mmap"))
+MMAP_STORE_DTYPE = os.getenv("MMAP_STORE_DTYPE", "float32")  # float32 | float16
+MMAP_STORE_IVF_LISTS = int(os.getenv("MMAP_STORE_IVF_LISTS", "0"))  # 0 = always brute force
+MMAP_STORE_NPROBE = int(os.getenv("MMAP_STORE_NPROBE", "8"))
+
+# in-memory caches in front of ChromaLlamaIndexer.query (entries)
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+
+# SQLite database behind /users
+DATABASE_PATH = os.getenv("DATABASE_PATH", "./test.db")
+USERS_ASYNC_DB = os.getenv("USERS_ASYNC_DB", "0") == "1"  # serve /users from the aiosqlite engine
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# read-through cache of users by id (GET/PATCH/DELETE /users)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", "5"))
+
+# startup: warm the LLM client in the background once the app is up; import budget for bench/startup_bench.py
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") == "1"
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+# agent tools (function_calling.py): shared HTTP client, result memoization, parallel calls
+WEATHER_API_URL = os.getenv("WEATHER_API_URL", "https://wttr.in")
+TOOL_HTTP_TIMEOUT = float(os.getenv("TOOL_HTTP_TIMEOUT", "10"))
+TOOL_HTTP_MAX_CONNECTIONS = int(os.getenv("TOOL_HTTP_MAX_CONNECTIONS", "20"))
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "8"))
+
+# streaming ingestion (ChromaLlamaIndexer(streaming=True)): peak memory ~ one window, not one document
+STREAM_INGEST = os.getenv("STREAM_INGEST", "0") == "1"
+STREAM_WINDOW_CHUNKS = int(os.getenv("STREAM_WINDOW_CHUNKS", "64"))
+
+# context assembly between retrieval and synthesis (rag/context.py)
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "2"))
+CONTEXT_ASSEMBLY = os.getenv("CONTEXT_ASSEMBLY", "1") == "1"
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.95"))  # cosine; 1.0 = exact duplicates only
+CONTEXT_SENTENCE_KEEP = float(os.getenv("CONTEXT_SENTENCE_KEEP", "0.6"))  # share of each chunk's sentences kept; 1.0 = no trimming
+CONTEXT_TRIM_MIN_TOKENS = int(os.getenv("CONTEXT_TRIM_MIN_TOKENS", "128"))  # shorter chunks are kept whole, without embedding their sentences
+
+# paragraph-anchored chunking (rag/chunking.py): shorter paragraphs are joined until a run reaches this size
+CHUNK_MIN_CHARS = int(os.getenv("CHUNK_MIN_CHARS", "500"))
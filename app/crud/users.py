@@ -1,8 +1,14 @@
 from fastapi import HTTPException, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.users import Users
-from schema.users import UserCreate, UserUpdate
-from uuid import UUID
+from schema.users import BulkConflict, BulkResult, UserBulkUpdate, UserCreate, UserRead, UserUpdate
+from services.user_cache import user_cache
+from uuid import UUID, uuid4
+
+# stay under SQLite's bound-parameter limit in IN (...) lists
+IN_CHUNK = 500
 
 
 def create_user(db: Session, user_create: UserCreate):
@@ -10,16 +16,39 @@ def create_user(db: Session, user_create: UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    user_cache.invalidate(db_user.id)
     return db_user
 
 def get_user(db: Session, user_id: UUID):
     return db.query(Users).filter(Users.id == user_id).first()
 
-def get_users(db: Session):
-    return db.query(Users).all()
+def get_user_read(db: Session, user_id: UUID):
+    # read-through: cached UserRead (or cached "not found") before touching the database
+    found, user, token = user_cache.lookup(user_id)
+    if found:
+        return user
+    row = get_user(db=db, user_id=user_id)
+    user = UserRead.model_validate(row, from_attributes=True) if row else None
+    user_cache.store(user_id, user, token)
+    return user
+
+def get_users(db: Session, limit: int = 100, after: UUID | None = None):
+    # keyset pagination: the index on id does the seek, no OFFSET scan
+    query = db.query(Users).order_by(Users.id)
+    if after is not None:
+        query = query.filter(Users.id > after)
+    return query.limit(limit).all()
+
+def iter_users(db: Session, chunk_size: int = 1000):
+    # rows are fetched from the cursor chunk_size at a time, never all at once
+    result = db.execute(
+        select(Users).order_by(Users.id).execution_options(yield_per=chunk_size)
+    )
+    for user in result.scalars():
+        yield user
 
 def update_user(db: Session, user_id: UUID, user_update: UserUpdate):
-    user = get_user(db=db, user_id=user_id)
+    user = None if user_cache.is_missing(user_id) else get_user(db=db, user_id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="user not found"
@@ -33,11 +62,12 @@ def update_user(db: Session, user_id: UUID, user_update: UserUpdate):
 
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user_id)
     return user
 
 
 def user_delete(user_id: UUID, db: Session):
-    user = get_user(db=db, user_id=user_id)
+    user = None if user_cache.is_missing(user_id) else get_user(db=db, user_id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="user not found"
@@ -45,8 +75,132 @@ def user_delete(user_id: UUID, db: Session):
     
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user_id)
     return {"OK": True, "details": f"user {user.name} has been deleted"}
 
-    
 
-    
+def _existing(db: Session, column, values):
+    """Map value -> user id for the rows whose `column` is in `values` (one SELECT per chunk)."""
+    values = list(dict.fromkeys(values))
+    found = {}
+    for i in range(0, len(values), IN_CHUNK):
+        batch = values[i:i + IN_CHUNK]
+        found.update(db.execute(select(column, Users.id).where(column.in_(batch))).all())
+    return found
+
+
+def _write(db: Session, statement, rows, result: BulkResult, conflicts_for):
+    """Run one executemany; if a concurrent writer still trips a unique index, retry row by row."""
+    if not rows:
+        return rows
+    try:
+        with db.begin_nested():
+            db.execute(statement, rows)
+        return rows
+    except IntegrityError:
+        pass
+    written = []
+    for row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(statement, [row])
+            written.append(row)
+        except IntegrityError:
+            result.conflicts.append(conflicts_for(row))
+    return written
+
+
+def bulk_create_users(db: Session, users: list[UserCreate], upsert: bool = False):
+    # upsert=True updates the name of users whose email already exists instead of reporting a conflict
+    result = BulkResult()
+    taken = _existing(db, Users.email, [user.email for user in users])
+    rows, updates, seen = [], [], set()
+    index_of = {}
+    for index, user in enumerate(users):
+        if user.email in seen:
+            result.conflicts.append(BulkConflict(index=index, email=user.email, detail="duplicate email in batch"))
+            continue
+        seen.add(user.email)
+        index_of[user.email] = index
+        if user.email in taken:
+            if upsert:
+                updates.append({"id": taken[user.email], "name": user.name})
+            else:
+                result.conflicts.append(
+                    BulkConflict(index=index, id=taken[user.email], email=user.email, detail="email already registered")
+                )
+            continue
+        rows.append({"id": uuid4(), "name": user.name, "email": user.email})
+
+    def conflict(row):
+        return BulkConflict(index=index_of[row["email"]], email=row["email"], detail="email already registered")
+
+    result.created = [row["id"] for row in _write(db, insert(Users), rows, result, conflict)]
+    if updates:
+        db.execute(update(Users), updates)
+        result.updated = [row["id"] for row in updates]
+    db.commit()
+    user_cache.invalidate(*result.created, *result.updated)
+    result.conflicts.sort(key=lambda c: c.index)
+    return result
+
+
+def bulk_update_users(db: Session, updates: list[UserBulkUpdate]):
+    result = BulkResult()
+    known = _existing(db, Users.id, [item.id for item in updates])
+    owners = _existing(db, Users.email, [item.email for item in updates if item.email])
+    rows, seen_ids, seen_emails = [], set(), set()
+    index_of = {}
+    for index, item in enumerate(updates):
+        if item.id not in known:
+            result.conflicts.append(BulkConflict(index=index, id=item.id, detail="user not found"))
+            continue
+        if item.id in seen_ids:
+            result.conflicts.append(BulkConflict(index=index, id=item.id, detail="duplicate id in batch"))
+            continue
+        if item.email and (owners.get(item.email, item.id) != item.id or item.email in seen_emails):
+            result.conflicts.append(
+                BulkConflict(index=index, id=item.id, email=item.email, detail="email already registered")
+            )
+            continue
+        seen_ids.add(item.id)
+        index_of[item.id] = index
+        row = {"id": item.id}
+        if item.name:
+            row["name"] = item.name
+        if item.email:
+            row["email"] = item.email
+            seen_emails.add(item.email)
+        if len(row) > 1:
+            rows.append(row)
+
+    def conflict(row):
+        return BulkConflict(
+            index=index_of[row["id"]], id=row["id"], email=row.get("email"), detail="email already registered"
+        )
+
+    # ORM bulk UPDATE by primary key: one executemany per distinct set of columns
+    result.updated = [row["id"] for row in _write(db, update(Users), rows, result, conflict)]
+    db.commit()
+    user_cache.invalidate(*result.updated)
+    result.conflicts.sort(key=lambda c: c.index)
+    return result
+
+
+def bulk_delete_users(db: Session, user_ids: list[UUID]):
+    result = BulkResult()
+    known = _existing(db, Users.id, user_ids)
+    seen = set()
+    for index, user_id in enumerate(user_ids):
+        if user_id not in known:
+            result.conflicts.append(BulkConflict(index=index, id=user_id, detail="user not found"))
+        elif user_id in seen:
+            result.conflicts.append(BulkConflict(index=index, id=user_id, detail="duplicate id in batch"))
+        else:
+            seen.add(user_id)
+            result.deleted.append(user_id)
+    for i in range(0, len(result.deleted), IN_CHUNK):
+        db.execute(delete(Users).where(Users.id.in_(result.deleted[i:i + IN_CHUNK])))
+    db.commit()
+    user_cache.invalidate(*result.deleted)
+    return result
@@ -0,0 +1,73 @@
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.users import Users
+from schema.users import UserCreate, UserRead, UserUpdate
+from services.user_cache import user_cache
+from uuid import UUID
+
+# async versions of crud/users.py for the aiosqlite engine (config.USERS_ASYNC_DB)
+
+
+async def create_user(db: AsyncSession, user_create: UserCreate):
+    db_user = Users(name=user_create.name, email=user_create.email)
+    db.add(db_user)
+    await db.commit()  # expire_on_commit=False: no refresh round-trip needed
+    user_cache.invalidate(db_user.id)
+    return db_user
+
+async def get_user(db: AsyncSession, user_id: UUID):
+    return await db.get(Users, user_id)
+
+async def get_user_read(db: AsyncSession, user_id: UUID):
+    found, user, token = user_cache.lookup(user_id)
+    if found:
+        return user
+    row = await get_user(db=db, user_id=user_id)
+    user = UserRead.model_validate(row, from_attributes=True) if row else None
+    user_cache.store(user_id, user, token)
+    return user
+
+async def get_users(db: AsyncSession, limit: int = 100, after: UUID | None = None):
+    query = select(Users).order_by(Users.id)
+    if after is not None:
+        query = query.where(Users.id > after)
+    result = await db.scalars(query.limit(limit))
+    return result.all()
+
+async def iter_users(db: AsyncSession, chunk_size: int = 1000):
+    result = await db.stream_scalars(
+        select(Users).order_by(Users.id).execution_options(yield_per=chunk_size)
+    )
+    async for user in result:
+        yield user
+
+async def update_user(db: AsyncSession, user_id: UUID, user_update: UserUpdate):
+    user = None if user_cache.is_missing(user_id) else await get_user(db=db, user_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="user not found"
+            )
+
+    if user_update.name:
+        user.name = user_update.name
+
+    if user_update.email:
+        user.email = user_update.email
+
+    await db.commit()
+    user_cache.invalidate(user_id)
+    return user
+
+
+async def user_delete(user_id: UUID, db: AsyncSession):
+    user = None if user_cache.is_missing(user_id) else await get_user(db=db, user_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="user not found"
+            )
+
+    await db.delete(user)
+    await db.commit()
+    user_cache.invalidate(user_id)
+    return {"OK": True, "details": f"user {user.name} has been deleted"}
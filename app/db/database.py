@@ -1,16 +1,87 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from services.metrics import db_query_duration
+from core import config
 
 
 
-SQLALCHAMY_DB_URI = "sqlite:///./test.db"
+SQLALCHAMY_DB_URI = f"sqlite:///{config.DATABASE_PATH}"
+ASYNC_SQLALCHAMY_DB_URI = f"sqlite+aiosqlite:///{config.DATABASE_PATH}"
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer, NORMAL only fsyncs at checkpoints,
+    # and busy_timeout makes a second writer wait instead of failing with "database is locked"
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    db_query_duration.observe(time.perf_counter() - start, operation=operation)
+
+
+def instrument(sync_engine):
+    event.listen(sync_engine, "connect", set_sqlite_pragmas)
+    event.listen(sync_engine, "before_cursor_execute", start_query_timer)
+    event.listen(sync_engine, "after_cursor_execute", stop_query_timer)
+
 
 engine = create_engine(
-    url=SQLALCHAMY_DB_URI
+    url=SQLALCHAMY_DB_URI,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    connect_args={"check_same_thread": False},
     )
+instrument(engine)
 
 session_local = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
-Base = declarative_base()
+# optional async path (aiosqlite), same file and pragmas; created on first use
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(
+            url=ASYNC_SQLALCHAMY_DB_URI,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            )
+        instrument(_async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(
+            bind=_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+            )
+    return _async_engine
+
 
+def async_session_local():
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+Base = declarative_base()
@@ -1,4 +1,4 @@
-from .database import session_local, engine
+from .database import session_local, async_session_local, engine
 
 
 def get_db():
@@ -7,3 +7,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with async_session_local() as db:
+        yield db
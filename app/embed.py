@@ -1,17 +1,324 @@
-from transformers import AutoTokenizer, AutoModel
+import asyncio
+import hashlib
+import queue
+import threading
+import time
+import warnings
+from concurrent.futures import Future
+from typing import Any, List
 import torch
+from pydantic import PrivateAttr
+from transformers import AutoTokenizer, AutoModel
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from core import config
 
 
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModel.from_pretrained(MODEL_NAME)
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+def mean_pool(last_hidden_state: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+    """Mean over real tokens only; padding positions are masked out."""
+    mask = attention_mask.unsqueeze(-1).to(last_hidden_state.dtype)
+    summed = (last_hidden_state * mask).sum(dim=1)
+    return summed / mask.sum(dim=1).clamp(min=1e-9)
+
+
+class _Request:
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self.future: Future = Future()
+
+
+class MiniLMEmbedder:
+    """
+    CPU sentence-embedding engine around MiniLM.
+
+    Concurrent `embed` calls are queued and a single worker thread folds
+    them into dynamic micro-batches: it waits up to `max_wait_ms` for more
+    requests once the first one arrives, or until `max_batch_size` texts
+    are ready. Inside a batch, inputs are sorted by token length and run in
+    buckets of `bucket_size`, each padded to its own longest input, so short
+    sentences do not pay for the longest one. Buckets are kept smaller than
+    the batch: a full batch then still spans several padding lengths.
+
+    `precision="int8"` dynamically quantizes the Linear layers and
+    `precision="bf16"` casts the weights to bfloat16; both are opt-in
+    (see bench/embed_precision.py for the recall cost). `output_dim`
+    shrinks the vectors before they reach the store, either by keeping the
+    first dimensions (`reduction="truncate"`) or by projecting on principal
+    components learned with `fit_projection` (`reduction="pca"`). A fitted
+    projection is saved with `save_projection` and loaded back through
+    `projection_path`; its hash is part of `variant`, so vectors from two
+    different fits never share a cache entry or an index.
+    """
+
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        max_batch_size: int = 32,
+        bucket_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_length: int = 256,
+        num_threads: int | None = None,
+        normalize: bool = True,
+        precision: str = "fp32",
+        output_dim: int | None = None,
+        reduction: str = "truncate",
+        projection_path: str | None = None,
+    ):
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+        if reduction not in ("truncate", "pca"):
+            raise ValueError(f"reduction must be 'truncate' or 'pca', got {reduction!r}")
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.bucket_size = bucket_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_length = max_length
+        self.num_threads = num_threads
+        self.normalize = normalize
+        self.precision = precision
+        self.output_dim = output_dim
+        self.reduction = reduction
+        self.projection: torch.Tensor | None = None  # (hidden, output_dim), set by fit_projection
+        self.mean: torch.Tensor | None = None
+        if projection_path:
+            self.load_projection(projection_path)
+        self.tokenizer = None
+        self.model = None
+        self.batches = 0
+        self.texts = 0
+        self._queue: queue.Queue[_Request | None] = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._worker = None
+
+    def load(self):
+        """Load tokenizer and weights (done lazily on first use)."""
+        with self._load_lock:
+            if self.model is None:
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                model = AutoModel.from_pretrained(self.model_name)
+                model.eval()
+                if self.precision == "int8":
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore")  # torch flags the qint8 helpers as deprecated
+                        model = torch.ao.quantization.quantize_dynamic(
+                            model, {torch.nn.Linear}, dtype=torch.qint8
+                        )
+                elif self.precision == "bf16":
+                    model = model.to(torch.bfloat16)
+                self.model = model
+        return self
+
+    @property
+    def variant(self) -> str:
+        """Model name plus precision/reduction, so caches never mix vector spaces."""
+        name = f"{self.model_name}@{self.precision}"
+        if self.output_dim:
+            name += f"/{self.reduction}{self.output_dim}"
+            if self.reduction == "pca":
+                name += f"-{self.projection_hash}"
+        return name
+
+    @property
+    def projection_hash(self) -> str:
+        if self.projection is None:
+            raise RuntimeError("reduction='pca' needs fit_projection() or projection_path first")
+        digest = hashlib.sha256()
+        for tensor in (self.mean, self.projection):
+            digest.update(tensor.float().contiguous().numpy().tobytes())
+        return digest.hexdigest()[:12]
+
+    def fit_projection(self, texts: list[str]):
+        """Learn the PCA projection used by `reduction="pca"` from a sample corpus."""
+        if not self.output_dim:
+            raise ValueError("fit_projection needs output_dim")
+        vectors = self._encode_full(texts)
+        self.mean = vectors.mean(dim=0)
+        _, _, v = torch.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.projection = v[: self.output_dim].T.contiguous()
+        return self
+
+    def save_projection(self, path: str):
+        """Write the fitted PCA projection, to be reloaded with `projection_path`."""
+        if self.projection is None:
+            raise RuntimeError("nothing to save, call fit_projection() first")
+        torch.save({"model": self.model_name, "mean": self.mean, "projection": self.projection}, path)
+
+    def load_projection(self, path: str):
+        state = torch.load(path, map_location="cpu")
+        if state["model"] != self.model_name:
+            raise ValueError(f"projection at {path} was fitted for {state['model']}, not {self.model_name}")
+        if self.output_dim and state["projection"].shape[1] != self.output_dim:
+            raise ValueError(f"projection at {path} has {state['projection'].shape[1]} dims, expected {self.output_dim}")
+        self.mean, self.projection = state["mean"], state["projection"]
+        self.output_dim = self.projection.shape[1]
+        return self
+
+    def _reduce(self, vectors: torch.Tensor) -> torch.Tensor:
+        if not self.output_dim:
+            return vectors
+        if self.reduction == "pca":
+            if self.projection is None:
+                raise RuntimeError("reduction='pca' needs fit_projection() or projection_path first")
+            vectors = (vectors - self.mean) @ self.projection
+        else:
+            vectors = vectors[:, : self.output_dim]
+        if self.normalize:
+            vectors = torch.nn.functional.normalize(vectors, p=2, dim=1)
+        return vectors
+
+    def start(self):
+        self.load()
+        with self._load_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="minilm-embedder", daemon=True)
+                self._worker.start()
+        return self
+
+    def stop(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed through the micro-batching queue (thread safe, blocking)."""
+        return self.submit(texts).result()
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def submit(self, texts: list[str]) -> Future:
+        if self._worker is None:
+            self.start()
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def encode(self, texts: list[str]) -> torch.Tensor:
+        """Embed `texts` directly, length-bucketed, in the calling thread."""
+        return self._reduce(self._encode_full(texts))
+
+    def _encode_full(self, texts: list[str]) -> torch.Tensor:
+        self.load()
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+        out = [None] * len(texts)
+        with torch.inference_mode():
+            for start in range(0, len(order), self.bucket_size):
+                bucket = order[start:start + self.bucket_size]
+                batch = self.tokenizer.pad(
+                    {key: [encoded[key][i] for i in bucket] for key in encoded.keys()},
+                    padding=True,
+                    return_tensors="pt",
+                )
+                outputs = self.model(**batch)
+                vectors = mean_pool(outputs.last_hidden_state, batch["attention_mask"]).float()
+                if self.normalize:
+                    vectors = torch.nn.functional.normalize(vectors, p=2, dim=1)
+                for i, vector in zip(bucket, vectors):
+                    out[i] = vector
+        return torch.stack(out)
+
+    def _collect(self, first: _Request) -> list[_Request]:
+        requests = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # let the run loop see the stop signal
+                break
+            requests.append(request)
+            size += len(request.texts)
+        return requests
+
+    def _run(self):
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        while (first := self._queue.get()) is not None:
+            requests = self._collect(first)
+            texts = [text for request in requests for text in request.texts]
+            try:
+                vectors = self.encode(texts).tolist()
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            offset = 0
+            for request in requests:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+
+class MiniLMEmbedding(BaseEmbedding):
+    """LlamaIndex embed model backed by `MiniLMEmbedder`, a drop-in for `OllamaEmbedding`."""
+
+    _embedder: MiniLMEmbedder = PrivateAttr()
+
+    def __init__(self, embedder: MiniLMEmbedder | None = None, **kwargs: Any):
+        embedder = embedder or get_embedder()
+        super().__init__(model_name=embedder.variant, **kwargs)
+        self._embedder = embedder
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MiniLMEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embedder.embed([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._embedder.aembed([query]))[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embedder.embed([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._embedder.aembed([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embedder.embed(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._embedder.aembed(texts)
+
+
+_embedder = None
 
-# texts = ["Hello world!", "How are you today?"]
-batchs = tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
 
-with torch.no_grad():
-    outputs = model(**batchs)
+def get_embedder() -> MiniLMEmbedder:
+    """Process-wide engine, so every caller shares the same micro-batches."""
+    global _embedder
+    if _embedder is None:
+        _embedder = MiniLMEmbedder(
+            precision=config.MINILM_PRECISION,
+            output_dim=config.MINILM_OUTPUT_DIM,
+            reduction=config.MINILM_REDUCTION,
+            projection_path=config.MINILM_PROJECTION_PATH,
+            num_threads=config.MINILM_THREADS,
+            max_batch_size=config.MINILM_MAX_BATCH_SIZE,
+            bucket_size=config.MINILM_BUCKET_SIZE,
+        )
+    return _embedder
 
-embeddings = outputs.last_hidden_state.mean(dim=1)
 
-print(embeddings.shape)
\ No newline at end of file
+if __name__ == "__main__":
+    texts = ["Hello world!", "How are you today?"]
+    embeddings = get_embedder().encode(texts)
+    print(embeddings.shape)
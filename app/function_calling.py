@@ -5,9 +5,13 @@ from llama_index.core.llms import ChatMessage
 from schema.llms import StructuredResponse
 from llama_index.core.agent.workflow import AgentStream, ToolCallResult
 import asyncio
-import requests
+import inspect
+from urllib.parse import quote
+import httpx
 from prompt import react_system_prompt
 from llama_index.core.tools import FunctionTool
+from services.tool_cache import tool_cache
+from core import config
 
 
 def multiply(a: int, b:int):
@@ -20,34 +24,100 @@ def add(a: int, b:int):
     return a + b
 
 
-def weather_today(city_name: str):
-    """the weather in the given city name"""
-    url=f"https://wttr.in/{city_name}?format=3"
-    response=requests.get(url=url)
-    if response.status_code==200: #الرقم 200 يعني الاستجابة response تمت بصورة صحيحة
+# One pooled client for every HTTP-backed tool, created on first use
+_http: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=httpx.Timeout(config.TOOL_HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.TOOL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.TOOL_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _http
+
+
+async def aclose_tools():
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+@tool_cache.memoize("weather_today", ttl=config.WEATHER_CACHE_TTL)
+async def fetch_weather(city: str) -> str:
+    url = f"{config.WEATHER_API_URL}/{quote(city)}"
+    response = await get_http_client().get(url, params={"format": "3"})
+    if response.status_code == 200: #الرقم 200 يعني الاستجابة response تمت بصورة صحيحة
         return response.text
     else:
-        raise RuntimeError()
+        raise RuntimeError(f"weather lookup for {city!r} failed with HTTP {response.status_code}")
 
 
-llm = Ollama("llama3.2")
+async def weather_today(city_name: str):
+    """the weather in the given city name"""
+    # "Cairo" and " cairo" are the same lookup
+    return await fetch_weather(city=" ".join(city_name.split()).casefold())
+
 
-weather_tool = FunctionTool.from_defaults(weather_today ,name="weather_today")
-add_tool = FunctionTool.from_defaults(add ,name="add")
+# What the agent may call, directly or through run_tools; get_tools() wraps exactly these
+TOOL_FUNCTIONS = {"weather_today": weather_today, "add": add}
 
-useless_tool = [
-    FunctionTool.from_defaults(multiply, name="multiply")
-]
 
-all_tools = [weather_tool] + [add_tool]
+async def run_tools(calls: list[dict]):
+    """
+    Run several independent tool calls at the same time and return their results in order.
+    Each call is {"tool": <tool name>, "args": {<argument>: <value>}}, e.g.
+    [{"tool": "weather_today", "args": {"city_name": "Cairo"}}, {"tool": "weather_today", "args": {"city_name": "Paris"}}]
+    """
+    semaphore = asyncio.Semaphore(config.TOOL_MAX_CONCURRENCY)
 
+    async def one(call: dict):
+        fn = TOOL_FUNCTIONS.get(call.get("tool"))
+        if fn is None:
+            return f"error: unknown tool {call.get('tool')!r}"
+        async with semaphore:
+            try:
+                result = fn(**call.get("args", {}))
+                return await result if inspect.isawaitable(result) else result
+            except Exception as e:
+                return f"error: {e}"
 
+    return await asyncio.gather(*(one(call) for call in calls))
 
-agent = ReActAgent(tools=all_tools, llm=llm)
-agent.update_prompts({"react_header": react_system_prompt})
-ctx = Context(agent)
 
-async def run_agent():
+# The LLM, tools and agent are built on first use, not at import time
+_agent = None
+
+
+def get_tools():
+    tools = [
+        FunctionTool.from_defaults(async_fn=fn, name=name) if inspect.iscoroutinefunction(fn)
+        else FunctionTool.from_defaults(fn, name=name)
+        for name, fn in TOOL_FUNCTIONS.items()
+    ]
+    # ReAct takes one action per step; this lets that action fan out to independent calls
+    parallel_tool = FunctionTool.from_defaults(async_fn=run_tools, name="run_tools")
+    return tools + [parallel_tool]
+
+
+def get_agent():
+    global _agent
+    if _agent is None:
+        llm = Ollama("llama3.2")
+        agent = ReActAgent(tools=get_tools(), llm=llm)
+        agent.update_prompts({"react_header": react_system_prompt})
+        _agent = agent
+    return _agent
+
+
+async def run_agent(ctx: Context | None = None):
+    agent = get_agent()
+    ctx = ctx or Context(agent)
     handler = agent.run("", ctx=ctx)
 
     async for ev in handler.stream_events():
@@ -60,6 +130,13 @@ async def run_agent():
     response = await handler
     print("\n\nFinal Response:", response)
 
+
+async def main():
+    try:
+        await run_agent()
+    finally:
+        await aclose_tools()
+
 if __name__ == "__main__":
-    asyncio.run(run_agent())
+    asyncio.run(main())
 
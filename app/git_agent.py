@@ -1,7 +1,11 @@
 import os
+import hashlib
 import subprocess
 import argparse
 import asyncio
+import re
+import time
+from collections import OrderedDict
 from llama_index.core.workflow import (
     Workflow, step, StartEvent, StopEvent, Event
 )
@@ -18,6 +22,104 @@ def find_repo_root() -> str:
     except subprocess.CalledProcessError:
         return os.getcwd()
 
+def read_diff(repo_root: str) -> str:
+    return subprocess.check_output(
+        ["git", "diff", "--relative=", "."],
+        cwd=repo_root
+    ).decode().strip()
+
+
+def status_fingerprint(repo_root: str) -> str | None:
+    """
+    Cheap digest of the working tree changes, or None when nothing is modified.
+
+    `git status --porcelain` only lists which tracked files differ from the
+    index, so the size and mtime of each listed file are mixed in as well:
+    editing an already-modified file again changes the digest, without
+    reading or diffing any file contents.
+    """
+    status = subprocess.check_output(
+        ["git", "status", "--porcelain=v1", "-z", "--untracked-files=no"],
+        cwd=repo_root
+    )
+    if not status:
+        return None
+    digest = hashlib.sha1(status)
+    entries = iter(status.split(b"\0"))
+    for entry in entries:
+        if not entry:
+            continue
+        if entry[:1] in (b"R", b"C"):
+            next(entries, None)  # renames/copies are followed by the original path, without a status
+        path = entry[3:].decode(errors="surrogateescape")
+        try:
+            st = os.stat(os.path.join(repo_root, path))
+        except OSError:  # deleted
+            continue
+        digest.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\0".encode(errors="surrogateescape"))
+    return digest.hexdigest()
+
+COMMIT_PROMPT = PromptTemplate(
+    "Generate a concise, descriptive git commit message for the following diff:\n\n{diff}"
+)
+SUMMARY_PROMPT = PromptTemplate(
+    "Summarize in one or two sentences what this part of a git diff changes and why, "
+    "naming the file:\n\n{diff}"
+)
+MERGE_PROMPT = PromptTemplate(
+    "Merge these summaries of parts of one git diff into a shorter list that keeps every "
+    "file name and every distinct change:\n\n{summaries}"
+)
+REDUCE_PROMPT = PromptTemplate(
+    "Generate a concise, descriptive git commit message (a short subject line, then a blank line "
+    "and a few bullet points) from these summaries of the changes:\n\n{summaries}"
+)
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@", re.MULTILINE)
+INDEX_LINE = re.compile(r"^index [0-9a-f]+\.\.[0-9a-f]+.*\n", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for code and English; only used to size prompts
+    return len(text) // 4 + 1
+
+
+def split_diff(diff: str, max_tokens: int) -> list[str]:
+    """
+    Split a unified diff into chunks of at most ~max_tokens: one chunk per
+    file when it fits, otherwise one per hunk (each repeating the file header),
+    and oversized hunks are cut by lines.
+    """
+    chunks = []
+    for file_diff in re.split(r"(?m)^(?=diff --git )", diff):
+        if not file_diff.strip():
+            continue
+        if estimate_tokens(file_diff) <= max_tokens:
+            chunks.append(file_diff)
+            continue
+        parts = HUNK_HEADER.split(file_diff)
+        headers = HUNK_HEADER.findall(file_diff)
+        file_header = parts[0]
+        for hunk_header, body in zip(headers, parts[1:]):
+            hunk = file_header + hunk_header + body
+            if estimate_tokens(hunk) <= max_tokens:
+                chunks.append(hunk)
+                continue
+            piece = file_header + hunk_header
+            for line in body.splitlines(keepends=True):
+                if estimate_tokens(piece + line) > max_tokens and piece != file_header + hunk_header:
+                    chunks.append(piece)
+                    piece = file_header + hunk_header
+                piece += line
+            chunks.append(piece)
+    return chunks
+
+
+def chunk_key(chunk: str) -> str:
+    # the blob ids on the "index" line change with any edit to the file, and hunk line
+    # numbers shift whenever an earlier hunk changes; leave both out of the key
+    stable = HUNK_HEADER.sub("@@", INDEX_LINE.sub("", chunk))
+    return hashlib.sha256(stable.encode()).hexdigest()
+
 # Custom events for workflow steps
 typing = None  # silence unused import
 class DiffEvent(Event):
@@ -26,28 +128,93 @@ class DiffEvent(Event):
 class MessageEvent(Event):
     message: str
 
+class StagedEvent(Event):
+    message: str
+
 class GitCommitWorkflow(Workflow):
     """
     Workflow to automatically commit Git changes via AI:
       1. get_diff          (StartEvent -> DiffEvent)
       2. generate_message  (DiffEvent -> MessageEvent)
-      3. stage_changes     (MessageEvent -> MessageEvent)
-      4. commit_changes    (MessageEvent -> StopEvent)
+      3. stage_changes     (MessageEvent -> StagedEvent)
+      4. commit_changes    (StagedEvent -> StopEvent)
+
+    Diffs larger than `max_prompt_tokens` are summarized map-reduce style:
+    per file/hunk chunks are summarized concurrently (at most
+    `max_concurrency` requests at once), the summaries are merged into the
+    message, and summaries are cached by chunk content so watch mode only
+    summarizes hunks it has not seen before.
     """
-    def __init__(self, model_name: str = "llama3.2"):
-        super().__init__()
-        self.repo_root = find_repo_root()
+    def __init__(
+        self,
+        model_name: str = "llama3.2",
+        base_url: str = "http://localhost:11434",
+        repo_root: str | None = None,
+        max_prompt_tokens: int = 3000,
+        max_concurrency: int = 4,
+        summary_cache_size: int = 2048,
+        timeout: float | None = 600.0,
+    ):
+        super().__init__(timeout=timeout)
+        self.repo_root = repo_root or find_repo_root()
        
-        self.llm = Ollama(model=model_name)
+        self.llm = Ollama(model=model_name, base_url=base_url)
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_concurrency = max_concurrency
+        self.summary_cache_size = summary_cache_size
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+
+    async def summarize_chunks(self, chunks: list[str]) -> list[str]:
+        """Map step: one summary per chunk, cached by content, with bounded parallelism."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def summarize(key: str, chunk: str) -> str:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+                return summary
+            async with semaphore:
+                summary = (await self.llm.apredict(SUMMARY_PROMPT, diff=chunk)).strip()
+            self._summaries[key] = summary
+            while len(self._summaries) > self.summary_cache_size:
+                self._summaries.popitem(last=False)
+            return summary
+
+        keys = [chunk_key(chunk) for chunk in chunks]
+        unique = dict(zip(keys, chunks))  # identical chunks share one request
+        cached = sum(key in self._summaries for key in unique)
+        print(f"[GitCommit] Summarizing {len(chunks)} chunks ({len(unique)} distinct, {cached} cached)...")
+        summaries = dict(zip(unique, await asyncio.gather(*(summarize(k, c) for k, c in unique.items()))))
+        return [summaries[key] for key in keys]
+
+    async def reduce_summaries(self, summaries: list[str]) -> str:
+        """Reduce step: merge summaries into the message, in rounds if they do not fit one prompt."""
+        while estimate_tokens("\n".join(summaries)) > self.max_prompt_tokens and len(summaries) > 1:
+            groups, group = [], []
+            for summary in summaries:
+                if group and estimate_tokens("\n".join(group + [summary])) > self.max_prompt_tokens:
+                    groups.append(group)
+                    group = []
+                group.append(summary)
+            groups.append(group)
+            if len(groups) == len(summaries):  # every summary alone is over budget; merge pairs
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def merge(group: list[str]) -> str:
+                async with semaphore:
+                    return (await self.llm.apredict(MERGE_PROMPT, summaries="\n".join(f"- {s}" for s in group))).strip()
+
+            summaries = await asyncio.gather(*(merge(group) for group in groups))
+        return await self.llm.apredict(REDUCE_PROMPT, summaries="\n".join(f"- {s}" for s in summaries))
 
     @step()
     async def get_diff(self, ev: StartEvent) -> DiffEvent:
-        """Step 1: Retrieve git diff."""
-        print("[GitCommit] Retrieving git diff...")
-        output = subprocess.check_output(
-            ["git", "diff", "--relative=", "."],
-            cwd=self.repo_root
-        ).decode().strip()
+        """Step 1: Retrieve git diff (or use the one passed to `run(diff=...)`)."""
+        output = ev.get("diff")
+        if output is None:
+            print("[GitCommit] Retrieving git diff...")
+            output = read_diff(self.repo_root)
         if not output:
             print("[GitCommit] No changes detected.")
         else:
@@ -62,29 +229,31 @@ class GitCommitWorkflow(Workflow):
             msg = "No changes detected."
             print(f"[GitCommit] Skipping message generation: {msg}")
             return MessageEvent(message=msg)
-        print("[GitCommit] Generating commit message from diff...")
-        prompt = (
-            "Generate a concise, descriptive git commit message for the following diff:\n\n" + diff
-        )
-        the_prompt = PromptTemplate(prompt)
-        msg = self.llm.predict(the_prompt)
+        if estimate_tokens(diff) <= self.max_prompt_tokens:
+            print("[GitCommit] Generating commit message from diff...")
+            msg = await self.llm.apredict(COMMIT_PROMPT, diff=diff)
+        else:
+            chunks = split_diff(diff, self.max_prompt_tokens)
+            summaries = await self.summarize_chunks(chunks)
+            print("[GitCommit] Generating commit message from the chunk summaries...")
+            msg = await self.reduce_summaries(summaries)
         msg = msg.strip()
         print(f"[GitCommit] Generated message: '{msg}'")
         return MessageEvent(message=msg)
 
     @step()
-    async def stage_changes(self, ev: MessageEvent) -> MessageEvent:
+    async def stage_changes(self, ev: MessageEvent) -> StagedEvent:
         """Step 3: Stage all changes for commit."""
         if ev.message == "No changes detected.":
             print("[GitCommit] Nothing to stage.")
-            return ev
+            return StagedEvent(message=ev.message)
         print("[GitCommit] Staging all changes...")
         subprocess.check_call(["git", "add", "-A"], cwd=self.repo_root)
         print("[GitCommit] Changes staged.")
-        return ev
+        return StagedEvent(message=ev.message)
 
     @step()
-    async def commit_changes(self, ev: MessageEvent) -> StopEvent:
+    async def commit_changes(self, ev: StagedEvent) -> StopEvent:
         """Step 4: Commit staged changes with the generated message."""
         if ev.message == "No changes detected.":
             print("[GitCommit] No commit created.")
@@ -94,32 +263,111 @@ class GitCommitWorkflow(Workflow):
         print("[GitCommit] Commit complete.")
         return StopEvent(result=f"Committed with message: {ev.message}")
 
-async def main(mode: str):
+class RepoWatcher:
+    """
+    Wakes the watch loop on filesystem events under the repository.
+
+    Events inside .git are ignored (our own commits write there). Bursts of
+    events are debounced: the loop only runs once nothing has changed for
+    `debounce` seconds. Without watchdog it falls back to polling.
+    """
+    def __init__(self, repo_root: str, debounce: float = 1.0, poll_interval: float | None = None):
+        self.repo_root = os.path.abspath(repo_root)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._changed = asyncio.Event()
+        self._last_event = 0.0
+        self._observer = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self.poll_interval is None:
+            try:
+                from watchdog.observers import Observer
+                from watchdog.events import FileSystemEventHandler
+            except ImportError:
+                self.poll_interval = 2.0
+                print("[GitCommit] watchdog not installed, polling instead.")
+        if self.poll_interval is not None:
+            return
+
+        git_dir = os.path.join(self.repo_root, ".git")
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [event.src_path, getattr(event, "dest_path", "")]
+                if all(not p or p == git_dir or p.startswith(git_dir + os.sep) for p in paths):
+                    return
+                loop.call_soon_threadsafe(watcher._notify)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), self.repo_root, recursive=True)
+        self._observer.start()
+
+    def _notify(self):
+        self._last_event = time.monotonic()
+        self._changed.set()
+
+    async def wait(self):
+        """Return once the tree may have changed and has then been quiet for `debounce` seconds."""
+        if self.poll_interval is not None:
+            await asyncio.sleep(self.poll_interval)
+            return
+        await self._changed.wait()
+        while (quiet := time.monotonic() - self._last_event) < self.debounce:
+            await asyncio.sleep(self.debounce - quiet)
+        self._changed.clear()
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+
+async def watch(workflow: GitCommitWorkflow, debounce: float = 1.0, poll_interval: float | None = None):
+    watcher = RepoWatcher(workflow.repo_root, debounce=debounce, poll_interval=poll_interval)
+    watcher.start()
+    mode = f"polling every {watcher.poll_interval}s" if watcher.poll_interval else f"debounce {debounce}s"
+    print(f"[GitCommit] Entering watch mode ({mode})...")
+    last_fingerprint = None
+    try:
+        while True:
+            fingerprint = status_fingerprint(workflow.repo_root)
+            if fingerprint is not None and fingerprint != last_fingerprint:
+                last_fingerprint = fingerprint
+                diff = read_diff(workflow.repo_root)
+                if diff:
+                    print("[GitCommit] Change detected, running workflow...")
+                    result = await workflow.run(diff=diff)
+                    print(f"[GitCommit] Result: {result}")
+            await watcher.wait()
+    finally:
+        watcher.stop()
+
+
+async def main(mode: str, debounce: float = 1.0, poll_interval: float | None = None):
     workflow = GitCommitWorkflow()
     if mode == "once":
         print("[GitCommit] Running single commit workflow...")
         result = await workflow.run()
         print(f"[GitCommit] Result: {result}")
     else:
-        print("[GitCommit] Entering watch mode (polling every 2s)...")
-        last_output = None 
-        while True:
-            output = subprocess.check_output(
-                ["git", "diff", "--relative=", "."],
-                cwd=workflow.repo_root
-            )
-            if output and output != last_output:
-                last_output = output
-                print("[GitCommit] Change detected, running workflow...")
-                result = await workflow.run()
-                print(f"[GitCommit] Result: {result}")
-            await asyncio.sleep(2)
+        await watch(workflow, debounce=debounce, poll_interval=poll_interval)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser("AI-powered Git commit workflow")
     parser.add_argument(
         "mode", choices=["once", "watch"], nargs="?", default="once",
-        help="once: commit immediately; watch: poll for changes"
+        help="once: commit immediately; watch: commit whenever the working tree changes"
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=1.0,
+        help="watch: seconds without file events before checking the tree"
+    )
+    parser.add_argument(
+        "--poll", type=float, default=None, metavar="SECONDS",
+        help="watch: poll at this interval instead of using filesystem events"
     )
     args = parser.parse_args()
-    asyncio.run(main(args.mode))
+    asyncio.run(main(args.mode, debounce=args.debounce, poll_interval=args.poll))
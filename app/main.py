@@ -1,17 +1,65 @@
-import uvicorn
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from api.endpoints import api_router
-from db.database import engine
+from db.database import engine, dispose_async_engine
 from models import users
+from services.llm_gateway import gateway
+from services.metrics import http_request_duration, http_requests_in_flight
+from core import config
 
-# models.Base.metadata.create_all(bind=engine)
-users.Base.metadata.create_all(bind=engine)
 
+async def warm_up():
+    # runs after startup has completed, so the worker takes traffic right away
+    try:
+        await gateway.warm_up(config.CHAT_MODEL)
+        print(f"[startup] Warm-up done for {config.CHAT_MODEL}")
+    except Exception as e:
+        print(f"[startup] Warm-up failed, first request will load lazily: {e!r}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # models.Base.metadata.create_all(bind=engine)
+    await asyncio.to_thread(users.Base.metadata.create_all, bind=engine)
+    warm = asyncio.create_task(warm_up()) if config.STARTUP_WARMUP else None
+    yield
+    if warm is not None:
+        warm.cancel()
+    await gateway.aclose()
+    await dispose_async_engine()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    http_requests_in_flight.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["Server-Timing"] = f"app;dur={(time.perf_counter() - start) * 1000:.1f}"
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        # label by route template (/users/{user_id}), not by raw path, to keep the series bounded
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+            )
 
-app = FastAPI()
 
 app.include_router(api_router)
 
 
 if __name__ == "__main__":
-    uvicorn.run(app=app, host="localhost", port=9393)
\ No newline at end of file
+    import uvicorn
+
+    uvicorn.run(app=app, host="localhost", port=9393)
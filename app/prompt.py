@@ -1,4 +1,10 @@
-from llama_index.core import PromptTemplate
+import re
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", prompt).strip().lower().rstrip("?!.")
+
 
 react_system_header_str = """\
 
@@ -24,4 +30,11 @@ Action Input: the input to the tool, in a JSON format representing the kwargs (e
 ```
 
 """
-react_system_prompt = PromptTemplate(react_system_header_str)
+def __getattr__(name):
+    # built on first use: importing llama_index here would slow down every importer of normalize_prompt
+    if name == "react_system_prompt":
+        from llama_index.core import PromptTemplate
+
+        globals()[name] = PromptTemplate(react_system_header_str)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
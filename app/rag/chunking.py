@@ -0,0 +1,65 @@
+"""
+Paragraph-anchored chunking.
+
+`SentenceSplitter` packs a whole file into fixed token windows, so editing
+one paragraph moves every later chunk boundary and, with content-hash ids,
+re-embeds the rest of the file. Here chunks follow paragraphs instead:
+
+- a paragraph of at least `min_chars` is a chunk of its own,
+- shorter ones (headings, list items) are joined with the paragraphs that
+  follow until the run reaches `min_chars`,
+- only a chunk longer than the splitter's window is cut into sentence
+  windows, and only within itself.
+
+The boundary after every long paragraph is fixed, so an edit changes the
+chunks of the paragraphs it touches (and their run of short neighbours)
+and nothing else in the file.
+"""
+import re
+from typing import Iterable, Iterator, List
+from llama_index.core import Document
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.settings import Settings
+from core import config
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in PARAGRAPH_BREAK.split(text) if p.strip()]
+
+
+def group_paragraphs(paragraphs: Iterable[str], min_chars: int = config.CHUNK_MIN_CHARS) -> Iterator[str]:
+    run, size = [], 0
+    for paragraph in paragraphs:
+        run.append(paragraph)
+        size += len(paragraph)
+        if size >= min_chars:
+            yield "\n\n".join(run)
+            run, size = [], 0
+    if run:
+        yield "\n\n".join(run)
+
+
+def chunk_texts(paragraphs: Iterable[str], splitter=None, min_chars: int = config.CHUNK_MIN_CHARS) -> Iterator[str]:
+    splitter = splitter or Settings.node_parser
+    for text in group_paragraphs(paragraphs, min_chars):
+        yield from splitter.split_text(text)  # a single window unless the run is too long
+
+
+def paragraph_nodes(texts: Iterable[str], source: str, metadata: dict | None = None) -> list:
+    """TextNodes of already chunked `texts`, pointing back to `source`."""
+    doc = Document(text="", id_=source, metadata=metadata or {"file_path": source})
+    nodes = build_nodes_from_splits(list(texts), doc)
+    for node in nodes:
+        node.metadata = dict(doc.metadata)
+    return nodes
+
+
+def chunk_documents(docs, source: str, splitter=None, min_chars: int = config.CHUNK_MIN_CHARS) -> list:
+    """Paragraph-anchored nodes of every document a reader returned for `source`."""
+    nodes = []
+    for doc in docs:
+        texts = chunk_texts(split_paragraphs(doc.text), splitter, min_chars)
+        nodes.extend(paragraph_nodes(texts, source, doc.metadata or None))
+    return nodes
@@ -0,0 +1,177 @@
+"""
+Context assembly between retrieval and synthesis: dedup -> trim -> pack.
+
+The synthesizer sends every retrieved chunk to the LLM verbatim, and on a
+CPU the prompt length sets the prefill time. `ContextAssembler` is a node
+postprocessor that, in score order,
+
+1. drops chunks whose embedding is nearly identical to a better-scoring one,
+2. keeps the sentences of each chunk longer than `trim_min_tokens` that are
+   closest to the query, in their original order; shorter chunks are kept
+   whole, which saves embedding their sentences on every query,
+3. packs the result into `max_tokens`, cutting the last chunk that fits at a
+   sentence boundary.
+
+Chunk embeddings come from the node when the vector store returns them.
+Otherwise the chunk is embedded again from the same text ingestion embedded
+(its content with embed metadata), so a `CachedEmbedding` answers from the
+vectors it stored then instead of calling the model.
+"""
+import math
+import re
+import threading
+from typing import Any, List, Optional
+import numpy as np
+from pydantic import PrivateAttr
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.settings import Settings
+from llama_index.core.utils import get_tokenizer
+from core import config
+from services.metrics import context_chunks_dropped, context_tokens
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+MIN_PIECE_TOKENS = 16  # below this, a partial chunk is not worth sending
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_END.split(text) if s and s.strip()]
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class ContextAssembler(BaseNodePostprocessor):
+    """Deduplicate, trim and budget retrieved chunks before they reach the prompt."""
+
+    max_tokens: int = config.CONTEXT_MAX_TOKENS
+    dedup_threshold: float = config.CONTEXT_DEDUP_THRESHOLD
+    sentence_keep: float = config.CONTEXT_SENTENCE_KEEP
+    trim_min_tokens: int = config.CONTEXT_TRIM_MIN_TOKENS
+
+    _embed_model: Optional[BaseEmbedding] = PrivateAttr(default=None)
+    _tokenizer: Any = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _totals: dict = PrivateAttr(default_factory=dict)
+
+    def __init__(self, embed_model: Optional[BaseEmbedding] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._embed_model = embed_model
+        self._tokenizer = get_tokenizer()
+        self._totals = {"queries": 0, "retrieved_tokens": 0, "assembled_tokens": 0, "duplicates": 0, "over_budget": 0}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextAssembler"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model or Settings.embed_model
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text))
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+        retrieved = totals["retrieved_tokens"]
+        totals["saved_ratio"] = round(1 - totals["assembled_tokens"] / retrieved, 4) if retrieved else 0.0
+        return totals
+
+    def _postprocess_nodes(
+        self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None
+    ) -> List[NodeWithScore]:
+        if not nodes:
+            return nodes
+        nodes = sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)
+        texts = [n.node.get_content(metadata_mode=MetadataMode.NONE) for n in nodes]
+        sizes = [self.count_tokens(t) for t in texts]
+        retrieved = sum(sizes)
+
+        kept = self._dedup(nodes)
+        pieces = self._trim([texts[i] for i in kept], [sizes[i] for i in kept], query_bundle)
+
+        assembled, used, over_budget = [], 0, 0
+        for i, sentences in zip(kept, pieces):
+            budget = self.max_tokens - used
+            text = " ".join(sentences)
+            size = self.count_tokens(text)
+            if size > budget:
+                text, size = self._fit(sentences, budget)
+                if size < MIN_PIECE_TOKENS:
+                    over_budget += 1
+                    continue
+            node = nodes[i].node.model_copy()  # the retrieval cache still holds the original
+            node.set_content(text)
+            assembled.append(NodeWithScore(node=node, score=nodes[i].score))
+            used += size
+
+        duplicates = len(nodes) - len(kept)
+        context_tokens.inc(retrieved, stage="retrieved")
+        context_tokens.inc(used, stage="assembled")
+        context_chunks_dropped.inc(duplicates, reason="duplicate")
+        context_chunks_dropped.inc(over_budget, reason="budget")
+        with self._lock:
+            self._totals["queries"] += 1
+            self._totals["retrieved_tokens"] += retrieved
+            self._totals["assembled_tokens"] += used
+            self._totals["duplicates"] += duplicates
+            self._totals["over_budget"] += over_budget
+        return assembled
+
+    # 1. Keep a chunk only if it is not a near-copy of one already kept (nodes are in score order)
+    def _dedup(self, nodes: List[NodeWithScore]) -> List[int]:
+        if len(nodes) < 2 or self.dedup_threshold >= 1.0:
+            return list(range(len(nodes)))
+        if all(n.node.embedding is not None for n in nodes):
+            vectors = [n.node.embedding for n in nodes]
+        else:
+            # the text ingestion embedded, so the embedding cache already holds these vectors
+            vectors = self.embed_model.get_text_embedding_batch(
+                [n.node.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+            )
+        unit = _unit_rows(vectors)
+        kept: List[int] = []
+        for i in range(len(nodes)):
+            if not kept or float(np.max(unit[kept] @ unit[i])) < self.dedup_threshold:
+                kept.append(i)
+        return kept
+
+    # 2. Per long chunk, the `sentence_keep` share of sentences most similar to the query, in document order
+    def _trim(self, texts: List[str], sizes: List[int], query_bundle: Optional[QueryBundle]) -> List[List[str]]:
+        split = [split_sentences(t) or [t] for t in texts]
+        if self.sentence_keep >= 1.0 or query_bundle is None:
+            return split
+        long = [i for i, size in enumerate(sizes) if size > self.trim_min_tokens and len(split[i]) > 1]
+        if not long:
+            return split
+        query = query_bundle.embedding or self.embed_model.get_agg_embedding_from_queries(
+            query_bundle.embedding_strs
+        )
+        flat = [s for i in long for s in split[i]]
+        scores = _unit_rows(self.embed_model.get_text_embedding_batch(flat)) @ _unit_rows([query])[0]
+
+        trimmed, offset = list(split), 0
+        for i in long:
+            sentences = split[i]
+            chunk_scores = scores[offset : offset + len(sentences)]
+            offset += len(sentences)
+            keep = max(1, math.ceil(len(sentences) * self.sentence_keep))
+            best = sorted(np.argsort(-chunk_scores, kind="stable")[:keep])
+            trimmed[i] = [sentences[j] for j in best]
+        return trimmed
+
+    # 3. Longest sentence prefix of a chunk that still fits in what is left of the budget
+    def _fit(self, sentences: List[str], budget: int) -> tuple[str, int]:
+        taken, used = [], 0
+        for sentence in sentences:
+            size = self.count_tokens(sentence) + (1 if taken else 0)
+            if used + size > budget:
+                break
+            taken.append(sentence)
+            used += size
+        return " ".join(taken), used
@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Any, List
+from pydantic import PrivateAttr
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from core import config
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class _VectorFile:
+    """Growable memory-mapped (rows, dim) matrix on disk."""
+
+    def __init__(self, path: str, dim: int, dtype: np.dtype):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = dim * self.dtype.itemsize
+        self.capacity = 0
+        self._mm = None
+        if os.path.exists(path):
+            self._open(os.path.getsize(path) // self.row_bytes)
+
+    def _open(self, rows: int):
+        self.capacity = rows
+        self._mm = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(rows, self.dim)) if rows else None
+
+    def ensure(self, rows: int):
+        if rows <= self.capacity:
+            return
+        new_capacity = max(rows, self.capacity * 2, 1024)
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+        with open(self.path, "ab") as f:
+            f.truncate(new_capacity * self.row_bytes)
+        self._open(new_capacity)
+
+    def read(self, slots: list[int]) -> np.ndarray:
+        return np.asarray(self._mm[slots], dtype=np.float32)
+
+    def write(self, slots: list[int], vectors: np.ndarray):
+        self.ensure(max(slots) + 1)
+        self._mm[slots] = vectors.astype(self.dtype)
+
+    def flush(self):
+        if self._mm is not None:
+            self._mm.flush()
+
+
+class EmbeddingStore:
+    """
+    Disk-backed embedding cache keyed by (model name, sha256 of the text).
+
+    Vectors live in one memory-mapped array file per model (float16 by
+    default, half the size of float32 with no measurable retrieval loss);
+    a small SQLite index maps keys to rows and tracks last access. When a
+    model's vectors would grow past `max_bytes`, the least recently used
+    rows are evicted and their slots reused.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = config.EMBED_CACHE_DIR,
+        max_bytes: int = config.EMBED_CACHE_MAX_BYTES,
+        dtype: str = config.EMBED_CACHE_DTYPE,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._files: dict[str, _VectorFile] = {}
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER, next_slot INTEGER)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vectors (
+                model TEXT NOT NULL,
+                key TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_vectors_lru ON vectors (model, last_access)")
+        self._conn.commit()
+
+    def _file(self, model: str, dim: int) -> _VectorFile:
+        vectors = self._files.get(model)
+        if vectors is None:
+            name = hashlib.sha1(model.encode()).hexdigest()[:16]
+            path = os.path.join(self.cache_dir, f"{name}.{dim}.{self.dtype.name}")
+            vectors = self._files[model] = _VectorFile(path, dim, self.dtype)
+        return vectors
+
+    def _slots(self, model: str, keys: list[str]) -> dict[str, int]:
+        found = {}
+        for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            batch = keys[i:i + 500]
+            found.update(
+                self._conn.execute(
+                    f"SELECT key, slot FROM vectors WHERE model = ? AND key IN ({','.join('?' * len(batch))})",
+                    (model, *batch),
+                ).fetchall()
+            )
+        return found
+
+    def get_many(self, model: str, keys: list[str]) -> list[np.ndarray | None]:
+        if not keys:
+            return []
+        with self._lock:
+            row = self._conn.execute("SELECT dim FROM models WHERE model = ?", (model,)).fetchone()
+            if row is None:
+                self.misses += len(keys)
+                return [None] * len(keys)
+            found = self._slots(model, list(dict.fromkeys(keys)))
+            results: list[np.ndarray | None] = [None] * len(keys)
+            if found:
+                hit_keys = list(found)
+                matrix = self._file(model, row[0]).read([found[k] for k in hit_keys])
+                vectors = dict(zip(hit_keys, matrix))
+                results = [vectors.get(k) for k in keys]
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE vectors SET last_access = ? WHERE model = ? AND key = ?",
+                    [(now, model, k) for k in hit_keys],
+                )
+                self._conn.commit()
+            hits = sum(r is not None for r in results)
+            self.hits += hits
+            self.misses += len(keys) - hits
+            return results
+
+    def put_many(self, model: str, keys: list[str], vectors: list[list[float]] | np.ndarray):
+        if not keys:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        dim = matrix.shape[1]
+        max_rows = max(1, self.max_bytes // (dim * self.dtype.itemsize))
+        with self._lock:
+            row = self._conn.execute("SELECT dim, next_slot FROM models WHERE model = ?", (model,)).fetchone()
+            if row is None:
+                self._conn.execute("INSERT INTO models VALUES (?, ?, 0)", (model, dim))
+                next_slot = 0
+            elif row[0] != dim:
+                raise ValueError(f"embedding cache for {model} holds dim {row[0]}, got {dim}")
+            else:
+                next_slot = row[1]
+
+            # drop duplicates and keys that are already stored
+            pending = dict(zip(keys, matrix))
+            existing = self._slots(model, list(pending))
+            new = [(k, v) for k, v in pending.items() if k not in existing][-max_rows:]
+            if not new:
+                self._conn.commit()
+                return
+
+            fresh = min(len(new), max(0, max_rows - next_slot))
+            slots = list(range(next_slot, next_slot + fresh))
+            if len(new) > fresh:
+                victims = self._conn.execute(
+                    "SELECT key, slot FROM vectors WHERE model = ? ORDER BY last_access LIMIT ?",
+                    (model, len(new) - fresh),
+                ).fetchall()
+                self._conn.executemany(
+                    "DELETE FROM vectors WHERE model = ? AND key = ?", [(model, k) for k, _ in victims]
+                )
+                slots += [slot for _, slot in victims]
+                self.evictions += len(victims)
+                new = new[:len(slots)]
+
+            self._file(model, dim).write(slots, np.vstack([v for _, v in new]))
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)",
+                [(model, k, slot, now) for (k, _), slot in zip(new, slots)],
+            )
+            self._conn.execute(
+                "UPDATE models SET next_slot = ? WHERE model = ?", (next_slot + fresh, model)
+            )
+            self._conn.commit()
+            self._file(model, dim).flush()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wrap any LlamaIndex embed model with the persistent `EmbeddingStore`.
+
+    Only texts that are not in the cache are sent to the wrapped model, in
+    one batch per call; results are written back before returning.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _store: EmbeddingStore = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, store: EmbeddingStore | None = None, **kwargs: Any):
+        super().__init__(
+            model_name=inner.model_name, embed_batch_size=inner.embed_batch_size, **kwargs
+        )
+        self._inner = inner
+        self._store = store or get_store()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def store(self) -> EmbeddingStore:
+        return self._store
+
+    def _lookup(self, texts: List[str], prefix: str = ""):
+        # query embeddings get their own keys: some models embed queries differently
+        keys = [text_key(prefix + text) for text in texts]
+        cached = self._store.get_many(self.model_name, keys)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        return keys, cached, missing
+
+    def _merge(self, keys, cached, missing, computed) -> List[List[float]]:
+        if missing:
+            self._store.put_many(self.model_name, [keys[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                cached[i] = vector
+        return [list(map(float, vector)) for vector in cached]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._lookup(texts)
+        computed = self._inner._get_text_embeddings([texts[i] for i in missing]) if missing else []
+        return self._merge(keys, cached, missing, computed)
+
+    # the async variants keep SQLite and memmap I/O off the event loop
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = await asyncio.to_thread(self._lookup, texts)
+        computed = await self._inner._aget_text_embeddings([texts[i] for i in missing]) if missing else []
+        return await asyncio.to_thread(self._merge, keys, cached, missing, computed)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        keys, cached, missing = self._lookup([query], prefix="query\x00")
+        computed = [self._inner._get_query_embedding(query)] if missing else []
+        return self._merge(keys, cached, missing, computed)[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        keys, cached, missing = await asyncio.to_thread(self._lookup, [query], "query\x00")
+        computed = [await self._inner._aget_query_embedding(query)] if missing else []
+        return (await asyncio.to_thread(self._merge, keys, cached, missing, computed))[0]
+
+
+_store = None
+
+
+def get_store() -> EmbeddingStore:
+    """Process-wide store shared by every ingestion path."""
+    global _store
+    if _store is None:
+        _store = EmbeddingStore()
+    return _store
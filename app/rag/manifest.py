@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Stable node id: same text from the same file always maps to the same id."""
+    return hashlib.sha256(f"{source}\x00{text}".encode()).hexdigest()
+
+
+def diff_chunks(changes: "FileChanges", nodes, known: set[str]) -> "FileChanges":
+    """Give `nodes` content-hash ids and fill in which are new and which are gone."""
+    chunks = {}
+    for node in nodes:
+        node.id_ = chunk_id(changes.source, node.get_content())
+        chunks.setdefault(node.id_, node)
+    changes.chunk_ids = list(chunks)
+    changes.new_nodes = [node for cid, node in chunks.items() if cid not in known]
+    changes.stale = list(known - chunks.keys())
+    return changes
+
+
+class IndexManifest:
+    """
+    Record of what is already embedded in a collection.
+
+    Maps every ingested file to the hash of its bytes and the ids of the
+    chunks it produced, so a rebuild only has to embed new chunks and
+    delete the ones that disappeared.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.files = json.load(f).get("files", {})
+
+    @classmethod
+    def for_collection(cls, chroma_dir: str, collection_name: str) -> "IndexManifest":
+        # kept next to the chroma directory, one manifest per collection
+        chroma_dir = os.path.abspath(chroma_dir)
+        name = f"{os.path.basename(chroma_dir)}.{collection_name}.manifest.json"
+        return cls(os.path.join(os.path.dirname(chroma_dir), name))
+
+    def file_hash(self, source: str) -> str | None:
+        entry = self.files.get(source)
+        return entry["hash"] if entry else None
+
+    def chunks(self, source: str) -> set[str]:
+        entry = self.files.get(source)
+        return set(entry["chunks"]) if entry else set()
+
+    def all_chunks(self) -> set[str]:
+        return {cid for entry in self.files.values() for cid in entry["chunks"]}
+
+    def set_file(self, source: str, hash: str, chunks: list[str]):
+        self.files[source] = {"hash": hash, "chunks": chunks}
+
+    def remove_file(self, source: str):
+        self.files.pop(source, None)
+
+    def clear(self):
+        self.files = {}
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "files": self.files}, f)
+        os.replace(tmp, self.path)
+
+
+@dataclass
+class FileChanges:
+    """What a re-index of one file has to write: new (embedded) nodes and stale chunk ids."""
+
+    source: str
+    digest: str
+    chunk_ids: list[str] = field(default_factory=list)
+    new_nodes: list = field(default_factory=list)
+    stale: list[str] = field(default_factory=list)
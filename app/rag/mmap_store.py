@@ -0,0 +1,577 @@
+import json
+import mmap
+import os
+import threading
+import numpy as np
+from typing import Any, List, NamedTuple
+from pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.simple import build_metadata_filter_fn
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+
+_BLOCK_ROWS = 65536  # rows scored per matmul; bounds the float32 copy of a float16 block
+
+
+def _line(node_id: str, text: str, metadata: dict) -> bytes:
+    # json.dumps escapes tabs and newlines, so both are safe separators
+    return f"{json.dumps(node_id)}\t{json.dumps({'text': text, 'metadata': metadata})}\n".encode()
+
+
+def _map_file(path: str) -> mmap.mmap | None:
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return None  # an empty file cannot be mapped
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _decode(nodes: mmap.mmap, offsets: np.ndarray, row: int) -> tuple[str, dict]:
+    line = nodes[offsets[row]:offsets[row + 1]]
+    entry = json.loads(line[line.index(b"\t") + 1:])
+    return entry["text"], entry["metadata"]
+
+
+class _View(NamedTuple):
+    """What a query reads, taken under the lock and searched outside it."""
+
+    vectors: Any
+    rows: int
+    alive: np.ndarray
+    ids: list
+    nodes: Any
+    offsets: np.ndarray
+    centroids: Any
+    lists: Any
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (vectors and centroids are unit length, score = dot product)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:
+                centroids[c] = vectors[rng.integers(len(vectors))]  # re-seed empty lists
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(min=1e-12)
+    return centroids
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """
+    In-process LlamaIndex vector store over a memory-mapped matrix.
+
+    Embeddings are L2-normalised and appended to one raw `rows x dim` file
+    (float32 or float16) that is memory-mapped, never read into the heap:
+    opening a store is instant and every process that maps the same file
+    shares the same page-cache pages. Node text and metadata go to an
+    append-only JSONL file, one line per row, which is memory-mapped as
+    well: opening a store decodes only the node ids and the line offsets,
+    a row's text and metadata are decoded when it is returned or filtered
+    on. `meta.json` says how many rows
+    are committed and which are deleted; it is replaced atomically after the
+    data files are flushed, so readers in other processes (`read_only=True`)
+    only ever see complete rows and pick up new commits on their next query.
+
+    Search is a brute-force cosine top-k with NumPy. With `ivf_lists` set,
+    a coarse quantizer (k-means centroids) is trained once the collection
+    has enough rows, and a query only scans the `nprobe` closest lists.
+    Deleted rows are tombstoned and compacted into new files when they make
+    up half of the matrix.
+
+    Committed rows are never rewritten in place, so a query only holds the
+    lock to snapshot the row count, the alive mask and the current file
+    maps; the scan itself runs unlocked, alongside writes and other queries.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+
+    path: str
+    dtype: str = "float32"
+    ivf_lists: int = 0
+    nprobe: int = 8
+    read_only: bool = False
+
+    _lock: Any = PrivateAttr()
+    _meta: dict = PrivateAttr()
+    _meta_stamp: Any = PrivateAttr(default=None)
+    _vectors: Any = PrivateAttr(default=None)  # np.memmap of the committed rows
+    _capacity: int = PrivateAttr(default=0)
+    _ids: list = PrivateAttr()  # row -> node id, None once deleted
+    _rows_of: dict = PrivateAttr()  # node id -> row
+    _nodes: Any = PrivateAttr(default=None)  # mmap of the nodes JSONL
+    _offsets: Any = PrivateAttr()  # row -> byte offset of its line, plus the end of the last one
+    _alive: Any = PrivateAttr()
+    _centroids: Any = PrivateAttr(default=None)
+    _assign: Any = PrivateAttr(default=None)  # row -> IVF list
+    _lists: Any = PrivateAttr(default=None)  # (rows sorted by list, offsets), built lazily
+
+    def __init__(
+        self,
+        path: str,
+        dtype: str = "float32",
+        ivf_lists: int = 0,
+        nprobe: int = 8,
+        read_only: bool = False,
+        **kwargs: Any,
+    ):
+        if np.dtype(dtype) not in (np.float32, np.float16):
+            raise ValueError(f"dtype must be float32 or float16, got {dtype!r}")
+        super().__init__(
+            path=path, dtype=np.dtype(dtype).name, ivf_lists=ivf_lists, nprobe=nprobe,
+            read_only=read_only, **kwargs,
+        )
+        if not read_only:
+            os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._load()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    def __len__(self) -> int:
+        self._refresh()
+        return int(self._alive.sum())
+
+    # -- files -------------------------------------------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _stamp(self):
+        try:
+            st = os.stat(self._file("meta.json"))
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _load(self):
+        with self._lock:
+            self._meta_stamp = self._stamp()
+            if self._meta_stamp is None:
+                self._meta = {
+                    "version": 1, "generation": 0, "dim": None, "dtype": self.dtype,
+                    "rows": 0, "deleted": [], "ivf": None,
+                }
+            else:
+                with open(self._file("meta.json")) as f:
+                    self._meta = json.load(f)
+                self.dtype = self._meta["dtype"]  # the files decide, not the caller
+            rows = self._meta["rows"]
+
+            ids, offsets, end = [], [0], 0
+            nodes_path = self._file(self._nodes_name())
+            nodes = _map_file(nodes_path)
+            if nodes is not None:
+                # "<id json>\t<payload json>": only the ids are decoded up front
+                for _ in range(rows):
+                    tab = nodes.find(b"\t", end)
+                    head = nodes[end:tab]
+                    ids.append(head[1:-1].decode() if b"\\" not in head else json.loads(head))
+                    end = nodes.find(b"\n", tab) + 1
+                    offsets.append(end)
+                if not self.read_only and end < len(nodes):
+                    # drop rows appended by a write that never committed
+                    os.truncate(nodes_path, end)
+                    nodes = _map_file(nodes_path)
+            alive = np.ones(len(ids), dtype=bool)
+            for row in self._meta["deleted"]:
+                ids[row] = None
+                alive[row] = False
+            self._ids, self._alive = ids, alive
+            self._nodes, self._offsets = nodes, np.asarray(offsets, dtype=np.int64)
+            self._rows_of = {node_id: row for row, node_id in enumerate(ids) if node_id is not None}
+
+            self._map(rows)
+            ivf = self._meta["ivf"]
+            if ivf:
+                self._centroids = np.load(self._file(ivf["centroids"]))
+                self._assign = np.load(self._file(ivf["lists"]))[:rows].copy()
+            else:
+                self._centroids = self._assign = None
+            self._lists = None
+
+    def _vectors_name(self) -> str:
+        return f"vectors.{self._meta['generation']}.{self.dtype}"
+
+    def _nodes_name(self) -> str:
+        return f"nodes.{self._meta['generation']}.jsonl"
+
+    def _map(self, rows: int):
+        """(Re)map the vector file; writers map the whole capacity, readers the committed rows."""
+        self._vectors = None
+        dim = self._meta["dim"]
+        path = self._file(self._vectors_name())
+        if not dim or not os.path.exists(path):
+            self._capacity = 0
+            return
+        row_bytes = dim * np.dtype(self.dtype).itemsize
+        self._capacity = rows if self.read_only else os.path.getsize(path) // row_bytes
+        if self._capacity:
+            mode = "r" if self.read_only else "r+"
+            self._vectors = np.memmap(path, dtype=self.dtype, mode=mode, shape=(self._capacity, dim))
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        dim = self._meta["dim"]
+        capacity = max(rows, self._capacity * 2, 1024)
+        if self._vectors is not None:
+            self._vectors.flush()
+        with open(self._file(self._vectors_name()), "ab") as f:
+            f.truncate(capacity * dim * np.dtype(self.dtype).itemsize)
+        self._map(self._meta["rows"])
+
+    def _refresh(self):
+        """Pick up commits made by another process (or another store object)."""
+        if self._stamp() != self._meta_stamp:
+            self._load()
+
+    def _commit(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._meta["deleted"] = [row for row, node_id in enumerate(self._ids) if node_id is None]
+        if self._assign is not None:
+            self._save_array(self._meta["ivf"]["lists"], self._assign)
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp, self._file("meta.json"))
+        self._meta_stamp = self._stamp()
+
+    def _save_array(self, name: str, array: np.ndarray):
+        tmp = self._file(f"{name}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, self._file(name))
+
+    def _payload(self, row: int) -> tuple[str, dict]:
+        return _decode(self._nodes, self._offsets, row)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError(f"{self.path} was opened read-only")
+
+    # -- writes ------------------------------------------------------------
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        self._check_writable()
+        with self._lock:
+            self._refresh()
+            self._append(nodes)
+            self._maybe_train()
+            self._commit()
+        return [node.node_id for node in nodes]
+
+    def replace(self, nodes: List[BaseNode], delete_ids: List[str]) -> None:
+        """
+        Add `nodes` and delete `delete_ids` in one commit.
+
+        Queries in this process and readers of the files see either the old
+        rows or the new ones, never both versions of an edited chunk.
+        """
+        if not nodes and not delete_ids:
+            return
+        self._check_writable()
+        with self._lock:
+            self._refresh()
+            removed = self._tombstone(delete_ids)
+            if nodes:
+                self._append(nodes)
+                self._maybe_train()
+            if removed:
+                self._maybe_compact()
+            self._commit()
+
+    def _append(self, nodes: List[BaseNode]):
+        """Write rows for `nodes`; the caller holds the lock and commits."""
+        matrix = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+        if self._meta["dim"] is None:
+            self._meta["dim"] = matrix.shape[1]
+        elif self._meta["dim"] != matrix.shape[1]:
+            raise ValueError(f"store holds dim {self._meta['dim']}, got {matrix.shape[1]}")
+
+        # re-adding an id replaces it, like Chroma's upsert
+        self._tombstone([node.node_id for node in nodes])
+        start = self._meta["rows"]
+        self._ensure_capacity(start + len(nodes))
+        self._vectors[start:start + len(nodes)] = matrix.astype(self.dtype)
+        ends = []
+        with open(self._file(self._nodes_name()), "ab") as f:
+            for row, node in enumerate(nodes, start):
+                text = node.get_content(metadata_mode=MetadataMode.NONE)
+                metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=False)
+                f.write(_line(node.node_id, text, metadata))
+                ends.append(f.tell())
+                self._ids.append(node.node_id)
+                self._rows_of[node.node_id] = row
+        # a fresh map and offsets array: a running query keeps the ones it snapshotted
+        self._nodes = _map_file(self._file(self._nodes_name()))
+        self._offsets = np.concatenate([self._offsets, np.asarray(ends, dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.ones(len(nodes), dtype=bool)])
+        if self._centroids is not None:
+            self._assign = np.concatenate([self._assign, self._nearest_lists(matrix)])
+            self._lists = None
+        self._meta["rows"] = start + len(nodes)
+
+    def _tombstone(self, node_ids) -> int:
+        removed = 0
+        for node_id in node_ids:
+            row = self._rows_of.pop(node_id, None)
+            if row is not None:
+                self._ids[row] = None
+                self._alive[row] = False
+                removed += 1
+        return removed
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        with self._lock:
+            self._refresh()
+            doc_ids = [
+                node_id for node_id, row in self._rows_of.items()
+                if self._payload(row)[1].get("ref_doc_id") == ref_doc_id
+            ]
+        self.delete_nodes(doc_ids)
+
+    def delete_nodes(
+        self,
+        node_ids: List[str] | None = None,
+        filters: MetadataFilters | None = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        self._check_writable()
+        with self._lock:
+            self._refresh()
+            node_ids = list(self._rows_of) if node_ids is None else node_ids
+            if filters is not None:
+                matches = build_metadata_filter_fn(lambda i: self._payload(self._rows_of[i])[1], filters)
+                node_ids = [i for i in node_ids if i in self._rows_of and matches(i)]
+            if self._tombstone(node_ids):
+                self._maybe_compact()
+                self._commit()
+
+    def clear(self) -> None:
+        self.delete_nodes()
+
+    def persist(self, persist_path: str | None = None, fs: Any = None) -> None:
+        # every write is already committed to disk
+        pass
+
+    def _maybe_compact(self):
+        rows = self._meta["rows"]
+        dead = rows - int(self._alive.sum())
+        if dead < max(1024, rows // 2):
+            return
+        keep = np.flatnonzero(self._alive)
+        old = [self._vectors_name(), self._nodes_name()]
+        self._meta["generation"] += 1
+        dim = self._meta["dim"]
+        vectors = np.memmap(
+            self._file(self._vectors_name()), dtype=self.dtype, mode="w+", shape=(max(len(keep), 1), dim)
+        )
+        for start in range(0, len(keep), _BLOCK_ROWS):
+            block = keep[start:start + _BLOCK_ROWS]
+            vectors[start:start + len(block)] = self._vectors[block]
+        vectors.flush()
+        del vectors
+        ends = []
+        with open(self._file(self._nodes_name()), "wb") as f:
+            for row in keep:
+                f.write(self._nodes[self._offsets[row]:self._offsets[row + 1]])  # copied, not re-encoded
+                ends.append(f.tell())
+
+        self._ids = [self._ids[row] for row in keep]
+        self._nodes = _map_file(self._file(self._nodes_name()))
+        self._offsets = np.asarray([0] + ends, dtype=np.int64)
+        self._rows_of = {node_id: row for row, node_id in enumerate(self._ids)}
+        self._alive = np.ones(len(keep), dtype=bool)
+        if self._assign is not None:
+            self._assign = self._assign[keep]
+            self._lists = None
+        self._meta["rows"] = len(keep)
+        self._map(len(keep))
+        print(f"[mmap-store] Compacted {self.path}: dropped {rows - len(keep)} deleted rows")
+        self._commit()
+        # readers that still map the old files keep their pages until they reload
+        for name in old:
+            try:
+                os.remove(self._file(name))
+            except FileNotFoundError:
+                pass
+
+    # -- IVF -----------------------------------------------------------------
+
+    def _maybe_train(self):
+        alive = int(self._alive.sum())
+        if not self.ivf_lists or alive < self.ivf_lists * 32:
+            return  # too few rows: brute force is as fast and exact
+        ivf = self._meta["ivf"]
+        if ivf and alive < 2 * ivf["trained_rows"]:
+            return
+        self.train_ivf()
+
+    def train_ivf(self, sample_size: int = 256):
+        """(Re)train the coarse quantizer on up to `sample_size` rows per list."""
+        self._check_writable()
+        with self._lock:
+            rows = np.flatnonzero(self._alive)
+            total = self._meta["rows"]
+            nlist = min(self.ivf_lists, len(rows))
+            if not nlist:
+                return
+            rng = np.random.default_rng(0)
+            sample = rng.choice(rows, size=min(len(rows), nlist * sample_size), replace=False)
+            sample.sort()
+            self._centroids = _kmeans(np.asarray(self._vectors[sample], dtype=np.float32), nlist)
+            self._assign = np.concatenate([
+                self._nearest_lists(np.asarray(self._vectors[start:min(start + _BLOCK_ROWS, total)], dtype=np.float32))
+                for start in range(0, total, _BLOCK_ROWS)
+            ]).astype(np.int32)
+            self._lists = None
+            # fresh file names, so a reader never pairs new centroids with old lists
+            old = self._meta["ivf"]
+            tag = f"{self._meta['generation']}.{self._meta['rows']}"
+            self._meta["ivf"] = {
+                "centroids": f"centroids.{tag}.npy",
+                "lists": f"lists.{tag}.npy",
+                "trained_rows": len(rows),
+            }
+            self._save_array(self._meta["ivf"]["centroids"], self._centroids)
+            self._commit()
+            if old and old != self._meta["ivf"]:
+                for name in (old["centroids"], old["lists"]):
+                    try:
+                        os.remove(self._file(name))
+                    except FileNotFoundError:
+                        pass
+            print(f"[mmap-store] Trained {nlist} IVF lists on {len(sample)} of {len(rows)} rows")
+
+    def _nearest_lists(self, matrix: np.ndarray) -> np.ndarray:
+        return np.argmax(matrix @ self._centroids.T, axis=1).astype(np.int32)
+
+    def _ivf_lists(self):
+        """(rows sorted by list, offsets), rebuilt after the assignments change."""
+        if self._lists is None:
+            order = np.argsort(self._assign, kind="stable")
+            counts = np.bincount(self._assign, minlength=len(self._centroids))
+            self._lists = (order, np.concatenate([[0], np.cumsum(counts)]))
+        return self._lists
+
+    def _candidates(self, view: _View, query: np.ndarray) -> np.ndarray | None:
+        """Rows in the `nprobe` lists closest to the query, or None for a full scan."""
+        if view.centroids is None:
+            return None
+        order, offsets = view.lists
+        probes = np.argpartition(-(view.centroids @ query), self.nprobe - 1)[: self.nprobe]
+        return np.sort(np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probes]))
+
+    # -- reads ---------------------------------------------------------------
+
+    def _view(self) -> _View:
+        """Snapshot of the committed rows; the caller holds the lock."""
+        rows = self._meta["rows"]
+        probe = self._centroids is not None and self.nprobe < len(self._centroids)
+        return _View(
+            vectors=self._vectors,
+            rows=rows,
+            alive=self._alive[:rows].copy(),  # tombstones flip it in place
+            ids=self._ids,
+            nodes=self._nodes,
+            offsets=self._offsets,
+            centroids=self._centroids if probe else None,
+            lists=self._ivf_lists() if probe else None,
+        )
+
+    def _scores(self, view: _View, query: np.ndarray, rows: np.ndarray | None) -> np.ndarray:
+        total = view.rows if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, _BLOCK_ROWS):
+            stop = min(start + _BLOCK_ROWS, total)  # a writer maps spare capacity past the last row
+            block = view.vectors[start:stop] if rows is None else view.vectors[rows[start:stop]]
+            scores[start:start + len(block)] = np.asarray(block, dtype=np.float32) @ query
+        return scores
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.query_embedding is None:
+            raise ValueError("MmapVectorStore only supports embedding queries")
+        with self._lock:
+            self._refresh()
+            view = self._view()
+        if not view.rows:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        vector = np.asarray(query.query_embedding, dtype=np.float32)
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+
+        rows = self._candidates(view, vector)
+        allowed = view.alive if rows is None else view.alive[rows]
+        if query.filters is not None or query.doc_ids or query.node_ids:
+            allowed = allowed & self._filter_mask(view, query, rows)
+        scores = self._scores(view, vector, rows)
+        scores[~allowed] = -np.inf
+
+        k = min(query.similarity_top_k, int(allowed.sum()))
+        if k <= 0:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        nodes, similarities, ids = [], [], []
+        for i in top:
+            row = int(i) if rows is None else int(rows[i])
+            text, metadata = _decode(view.nodes, view.offsets, row)
+            node = metadata_dict_to_node(metadata, text=text)
+            nodes.append(node)
+            similarities.append(float(scores[i]))
+            ids.append(node.node_id)  # view.ids may have been tombstoned since the snapshot
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
+
+    def _filter_mask(self, view: _View, query: VectorStoreQuery, rows: np.ndarray | None) -> np.ndarray:
+        rows = range(view.rows) if rows is None else rows
+
+        def payload(row: int) -> tuple[str, dict]:
+            return _decode(view.nodes, view.offsets, row)
+
+        matches = build_metadata_filter_fn(lambda row: payload(row)[1], query.filters)
+        doc_ids = set(query.doc_ids or ())
+        node_ids = set(query.node_ids or ())
+        mask = np.zeros(len(rows), dtype=bool)
+        for i, row in enumerate(rows):
+            if not view.alive[row]:
+                continue
+            if node_ids and view.ids[row] not in node_ids:
+                continue
+            if doc_ids and payload(row)[1].get("ref_doc_id") not in doc_ids:
+                continue
+            mask[i] = matches(row)
+        return mask
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            dim = self._meta["dim"] or 0
+            return {
+                "rows": self._meta["rows"],
+                "alive": int(self._alive.sum()),
+                "dim": dim,
+                "dtype": self.dtype,
+                "bytes": self._meta["rows"] * dim * np.dtype(self.dtype).itemsize,
+                "ivf_lists": 0 if self._centroids is None else len(self._centroids),
+            }
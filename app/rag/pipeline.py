@@ -0,0 +1,212 @@
+"""
+Parallel directory ingestion: parse -> chunk -> embed -> upsert.
+
+Parsing (Unstructured DOCX/PDF is CPU bound) runs in a process pool, the
+other stages run as asyncio tasks. Stages are joined by bounded queues so a
+slow stage back-pressures the ones before it and memory stays flat however
+many files the corpus has.
+
+    cd app && python -m rag.pipeline data --collection my_docs
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from llama_index.core.schema import MetadataMode
+from llama_index.readers.file import UnstructuredReader
+from rag.chunking import chunk_documents
+from rag.manifest import FileChanges, diff_chunks, file_hash
+from rag.streaming import read_documents
+
+_DONE = object()
+
+
+def parse_file(path: str, reader_cls=UnstructuredReader):
+    """Runs in a worker process."""
+    docs = read_documents(path, reader_cls)  # same text as ChromaLlamaIndexer's eager and streaming paths
+    for doc in docs:
+        doc.id_ = path
+    return docs
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    units: int = 0  # files for parse, chunks for the other stages
+    busy: float = 0.0
+
+    def report(self, wall: float) -> dict:
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "units": self.units,
+            "busy_s": round(self.busy, 3),
+            "units_per_s": round(self.units / wall, 1) if wall else 0.0,
+        }
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        indexer,
+        workers: int | None = None,
+        embed_batch_size: int = 64,
+        embed_concurrency: int = 4,
+        upsert_batch_size: int = 512,
+        queue_size: int = 8,
+        reader_cls=UnstructuredReader,
+    ):
+        self.indexer = indexer
+        self.workers = workers or os.cpu_count() or 1
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.upsert_batch_size = upsert_batch_size
+        self.queue_size = queue_size
+        self.reader_cls = reader_cls
+        self.stats = {
+            name: StageStats(name) for name in ("parse", "chunk", "embed", "upsert")
+        }
+
+    async def run(self, files: list[str]) -> dict:
+        start = time.perf_counter()
+        parsed = asyncio.Queue(self.queue_size)
+        chunked = asyncio.Queue(self.queue_size)
+        embedded = asyncio.Queue(self.queue_size)
+
+        embedders = [
+            asyncio.create_task(self._embed(chunked, embedded))
+            for _ in range(self.embed_concurrency)
+        ]
+        tasks = [
+            asyncio.create_task(self._parse(files, parsed)),
+            asyncio.create_task(self._chunk(parsed, chunked)),
+            asyncio.create_task(self._close_after(embedders, embedded)),
+            asyncio.create_task(self._upsert(embedded)),
+        ]
+        try:
+            await asyncio.gather(*tasks, *embedders)
+        except BaseException:
+            for task in tasks + embedders:
+                task.cancel()
+            raise
+
+        wall = time.perf_counter() - start
+        report = {
+            "files": len(files),
+            "wall_s": round(wall, 3),
+            "stages": [stage.report(wall) for stage in self.stats.values()],
+        }
+        for stage in report["stages"]:
+            print(
+                f"[pipeline] {stage['stage']:<7} {stage['units']:>7} units  "
+                f"{stage['units_per_s']:>9.1f}/s  busy {stage['busy_s']:.2f}s"
+            )
+        return report
+
+    async def _parse(self, files: list[str], out: asyncio.Queue):
+        stats = self.stats["parse"]
+        loop = asyncio.get_running_loop()
+        manifest = self.indexer.manifest
+        # never have more files in flight than the workers can chew on
+        in_flight = asyncio.Semaphore(self.workers * 2)
+
+        async def one(pool, source):
+            try:
+                digest = await asyncio.to_thread(file_hash, source)
+                if manifest.file_hash(source) == digest:
+                    await out.put((source, digest, None))  # unchanged, nothing to parse
+                    return
+                t0 = time.perf_counter()
+                docs = await loop.run_in_executor(pool, parse_file, source, self.reader_cls)
+                stats.busy += time.perf_counter() - t0
+                stats.items += 1
+                stats.units += 1
+                await out.put((source, digest, docs))
+            finally:
+                in_flight.release()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = []
+            for source in files:
+                await in_flight.acquire()
+                pending.append(asyncio.create_task(one(pool, source)))
+            await asyncio.gather(*pending)
+        await out.put(_DONE)
+
+    async def _chunk(self, inp: asyncio.Queue, out: asyncio.Queue):
+        stats = self.stats["chunk"]
+        manifest = self.indexer.manifest
+        while (item := await inp.get()) is not _DONE:
+            source, digest, docs = item
+            if docs is None:
+                continue
+            t0 = time.perf_counter()
+            nodes = await asyncio.to_thread(chunk_documents, docs, source)
+            work = diff_chunks(FileChanges(source, digest), nodes, manifest.chunks(source))
+            stats.busy += time.perf_counter() - t0
+            stats.items += 1
+            stats.units += len(work.new_nodes)
+            await out.put(work)
+        for _ in range(self.embed_concurrency):
+            await out.put(_DONE)
+
+    async def _embed(self, inp: asyncio.Queue, out: asyncio.Queue):
+        stats = self.stats["embed"]
+        embed_model = self.indexer.embedding_model
+        while (work := await inp.get()) is not _DONE:
+            t0 = time.perf_counter()
+            for i in range(0, len(work.new_nodes), self.embed_batch_size):
+                batch = work.new_nodes[i:i + self.embed_batch_size]
+                embeddings = await embed_model.aget_text_embedding_batch(
+                    [node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch]
+                )
+                for node, embedding in zip(batch, embeddings):
+                    node.embedding = embedding
+            stats.busy += time.perf_counter() - t0
+            stats.items += 1
+            stats.units += len(work.new_nodes)
+            await out.put(work)
+
+    async def _close_after(self, embedders: list[asyncio.Task], out: asyncio.Queue):
+        await asyncio.gather(*embedders)
+        await out.put(_DONE)
+
+    async def _upsert(self, inp: asyncio.Queue):
+        stats = self.stats["upsert"]
+        buffered: list[FileChanges] = []
+        size = 0
+        while True:
+            work = await inp.get()
+            if work is not _DONE:
+                buffered.append(work)
+                size += len(work.new_nodes)
+            if buffered and (work is _DONE or size >= self.upsert_batch_size):
+                t0 = time.perf_counter()
+                await asyncio.to_thread(self.indexer.apply_changes, buffered)
+                stats.busy += time.perf_counter() - t0
+                stats.items += 1
+                stats.units += size
+                buffered, size = [], 0
+            if work is _DONE:
+                return
+
+
+def main():
+    from vectordb import ChromaLlamaIndexer
+
+    parser = argparse.ArgumentParser("Parallel directory ingestion")
+    parser.add_argument("data_dir")
+    parser.add_argument("--collection", default="my_docs")
+    parser.add_argument("--chroma-dir", default="./chroma_db")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    indexer = ChromaLlamaIndexer(chroma_dir=args.chroma_dir, collection_name=args.collection)
+    indexer.ingest_directory(args.data_dir, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.constants import DEFAULT_SIMILARITY_TOP_K
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from core import config
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class QueryCache:
+    """
+    In-memory caches in front of `ChromaLlamaIndexer.query`.
+
+    - query text(s) -> query embedding (LRU). The vector only depends on the
+      embed model, so it stays valid across rebuilds.
+    - (generation, query vector, top_k) -> retrieved nodes (LRU). Every
+      rebuild calls `new_generation()`, which drops the whole layer, and
+      retrievers built before it keep writing under their old generation,
+      so a stale result can never be served for the new index.
+    """
+
+    def __init__(
+        self,
+        max_embeddings: int = config.QUERY_EMBED_CACHE_SIZE,
+        max_retrievals: int = config.RETRIEVAL_CACHE_SIZE,
+    ):
+        self.generation = 0
+        self.embeddings = _LRU(max_embeddings)
+        self.retrievals = _LRU(max_retrievals)
+        self._lock = threading.Lock()
+
+    def new_generation(self) -> int:
+        with self._lock:
+            self.generation += 1
+            self.retrievals.clear()
+            return self.generation
+
+    def embedding(self, texts: List[str], compute: Callable[[], List[float]]) -> List[float]:
+        key = "\x00".join(texts)
+        with self._lock:
+            vector = self.embeddings.get(key)
+        if vector is None:
+            vector = compute()
+            with self._lock:
+                self.embeddings.put(key, vector)
+        return vector
+
+    def retrieval(
+        self, generation: int, vector: List[float], top_k: int, compute: Callable[[], List[NodeWithScore]]
+    ) -> List[NodeWithScore]:
+        digest = hashlib.sha256(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()
+        key = (generation, digest, top_k)
+        with self._lock:
+            nodes = self.retrievals.get(key)
+        if nodes is None:
+            nodes = compute()
+            with self._lock:
+                if generation == self.generation:  # never repopulate after a rebuild
+                    self.retrievals.put(key, nodes)
+        # fresh wrappers: postprocessors are free to rescore what they get
+        return [NodeWithScore(node=n.node, score=n.score) for n in nodes]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "embeddings": self.embeddings.stats(),
+                "retrievals": self.retrievals.stats(),
+            }
+
+
+class CachedRetriever(BaseRetriever):
+    """Vector retriever that goes through `QueryCache` for the embedding and the search."""
+
+    def __init__(
+        self,
+        index,
+        cache: QueryCache,
+        generation: int,
+        similarity_top_k: int = DEFAULT_SIMILARITY_TOP_K,
+        **kwargs: Any,
+    ):
+        super().__init__()
+        self._inner = index.as_retriever(similarity_top_k=similarity_top_k, **kwargs)
+        self._embed_model = index._embed_model
+        self._cache = cache
+        self._generation = generation
+        self._top_k = similarity_top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        vector = query_bundle.embedding or self._cache.embedding(
+            query_bundle.embedding_strs,
+            lambda: self._embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs),
+        )
+        query_bundle.embedding = vector  # node postprocessors get the same bundle; spare them a second embedding
+        return self._cache.retrieval(
+            self._generation,
+            vector,
+            self._top_k,
+            lambda: self._inner.retrieve(QueryBundle(query_str=query_bundle.query_str, embedding=vector)),
+        )
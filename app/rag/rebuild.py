@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class RebuildQueue:
+    """
+    Background worker that turns bursts of filesystem events into rebuilds.
+
+    `submit(path)` only records the path. Once no new event has arrived for
+    `debounce` seconds the worker hands the whole set of changed paths to
+    `callback` in one call. Events that arrive while a rebuild is running
+    are coalesced into the next batch, so rebuilds never overlap.
+    """
+
+    def __init__(self, callback, debounce: float = 1.0, name: str = "rebuild-queue"):
+        self.callback = callback
+        self.debounce = debounce
+        self.rebuilds = 0
+        self.events = 0
+        self._pending: set[str] = set()
+        self._last_event = 0.0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> "RebuildQueue":
+        self._thread.start()
+        return self
+
+    def submit(self, path: str):
+        with self._cond:
+            self._pending.add(path)
+            self._last_event = time.monotonic()
+            self.events += 1
+            self._cond.notify()
+
+    def stop(self, timeout: float | None = None):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _next_batch(self) -> set[str] | None:
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                quiet_for = time.monotonic() - self._last_event
+                if quiet_for >= self.debounce:
+                    batch, self._pending = self._pending, set()
+                    return batch
+                self._cond.wait(self.debounce - quiet_for)
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            self.rebuilds += 1
+            print(f"[rebuild] Rebuilding for {len(batch)} changed path(s)…")
+            try:
+                self.callback(batch)
+            except Exception as e:
+                print(f"[rebuild] Rebuild failed: {e!r}")
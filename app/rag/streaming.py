@@ -0,0 +1,91 @@
+"""
+Bounded-memory ingestion: paragraphs -> chunks -> fixed-size windows.
+
+Everything here is a generator, so a caller that embeds and writes one
+window before asking for the next holds at most one paragraph run of raw
+text plus one window of chunks, however large a plain-text file is.
+
+`read_documents` is the eager counterpart: both read plain text straight
+from disk and everything else through the reader, and both chunk with
+rag.chunking, so a file gets the same chunk ids whichever path ingests it
+and toggling streaming does not re-embed anything.
+"""
+import os
+from itertools import islice
+from typing import Iterable, Iterator
+from llama_index.core import Document, SimpleDirectoryReader
+from llama_index.readers.file import UnstructuredReader
+from rag.chunking import chunk_documents, chunk_texts, paragraph_nodes
+
+# read incrementally, straight from disk; markup and data formats (HTML, XML,
+# JSON, CSV, ...) go through the reader, which knows how to extract their text
+TEXT_EXTENSIONS = {".txt", ".text", ".md", ".markdown", ".rst", ".log"}
+
+
+class DefaultFileReader:
+    """`SimpleDirectoryReader`'s per-extension readers behind the `load_data(file=...)` interface."""
+
+    def load_data(self, file, extra_info=None):
+        return SimpleDirectoryReader(input_files=[file]).load_data()
+
+
+def is_plain_text(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in TEXT_EXTENSIONS
+
+
+def read_documents(path: str, reader_cls=UnstructuredReader) -> list:
+    """Whole-file load with the same text source as `iter_file_chunks`."""
+    if is_plain_text(path):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return [Document(text=f.read(), id_=path, metadata={"file_path": path})]
+    return reader_cls().load_data(file=path)
+
+
+def iter_paragraphs(path: str, max_element_chars: int = 64 * 1024) -> Iterator[str]:
+    """
+    Yield the paragraphs of a plain-text file, read line by line.
+
+    Lines holding only spaces and tabs separate paragraphs, as in
+    `rag.chunking.split_paragraphs`. A paragraph longer than
+    `max_element_chars` is handed on in pieces; only such a paragraph can
+    chunk differently from the eager path.
+    """
+    paragraph, size = [], 0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            blank = not line.strip(" \t\n")
+            if not blank:
+                paragraph.append(line)
+                size += len(line)
+            if paragraph and (blank or size >= max_element_chars):
+                if text := "".join(paragraph).strip():
+                    yield text
+                paragraph, size = [], 0
+    if text := "".join(paragraph).strip():
+        yield text
+
+
+def iter_file_chunks(path: str, reader_cls=UnstructuredReader, splitter=None) -> Iterator:
+    """
+    Yield the paragraph-anchored nodes of a file one at a time.
+
+    Plain text is streamed from disk. Other formats (PDF, DOCX, HTML, ...)
+    still have to be parsed whole by `reader_cls`, but each document is
+    chunked and dropped before the next one.
+    """
+    if is_plain_text(path):
+        for text in chunk_texts(iter_paragraphs(path), splitter):
+            yield from paragraph_nodes([text], path)
+        return
+
+    docs = reader_cls().load_data(file=path)
+    docs.reverse()
+    while docs:
+        yield from chunk_documents([docs.pop()], path, splitter)
+
+
+def windows(items: Iterable, size: int) -> Iterator[list]:
+    """Consume `items` in lists of at most `size`; the next list is only built once the caller asks."""
+    iterator = iter(items)
+    while window := list(islice(iterator, size)):
+        yield window
@@ -0,0 +1,118 @@
+import inspect
+import threading
+import time
+from typing import Any, Dict, Optional
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.span.base import BaseSpan
+from llama_index.core.instrumentation.span_handlers.base import BaseSpanHandler
+from services.metrics import stage_duration, stage_errors
+
+# LlamaIndex span ids look like "<Class>.<method>-<uuid>"; the method says which stage it is
+STAGES = {
+    "get_query_embedding": "embedding",
+    "aget_query_embedding": "embedding",
+    "get_agg_embedding_from_queries": "embedding",
+    "aget_agg_embedding_from_queries": "embedding",
+    "get_text_embedding": "embedding",
+    "aget_text_embedding": "embedding",
+    "get_text_embedding_batch": "embedding",
+    "aget_text_embedding_batch": "embedding",
+    "retrieve": "retrieval",
+    "aretrieve": "retrieval",
+    "postprocess_nodes": "context",
+    "apostprocess_nodes": "context",
+    "synthesize": "synthesis",
+    "asynthesize": "synthesis",
+    "chat": "llm",
+    "achat": "llm",
+    "complete": "llm",
+    "acomplete": "llm",
+    "stream_chat": "llm",
+    "astream_chat": "llm",
+    "stream_complete": "llm",
+    "astream_complete": "llm",
+}
+
+
+class StageSpan(BaseSpan):
+    stage: Optional[str] = None
+    start: float = 0.0
+
+
+class StageSpanHandler(BaseSpanHandler[StageSpan]):
+    """
+    Feeds the `stage_duration_seconds` histogram from LlamaIndex's own spans.
+
+    Only the outermost span of a stage is timed, so a structured LLM wrapping
+    an Ollama call, or our cached retriever wrapping the vector retriever,
+    is counted once.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StageSpanHandler"
+
+    def new_span(
+        self,
+        id_: str,
+        bound_args: inspect.BoundArguments,
+        instance: Optional[Any] = None,
+        parent_span_id: Optional[str] = None,
+        tags: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Optional[StageSpan]:
+        stage = STAGES.get(id_.rsplit("-", 5)[0].rsplit(".", 1)[-1])
+        if stage is not None and self._inside(stage, parent_span_id):
+            stage = None
+        return StageSpan(id_=id_, parent_id=parent_span_id, stage=stage, start=time.perf_counter())
+
+    def _inside(self, stage: str, parent_id: Optional[str]) -> bool:
+        while parent_id is not None:
+            parent = self.open_spans.get(parent_id)
+            if parent is None:
+                return False
+            if parent.stage == stage:
+                return True
+            parent_id = parent.parent_id
+        return False
+
+    def prepare_to_exit_span(
+        self,
+        id_: str,
+        bound_args: inspect.BoundArguments,
+        instance: Optional[Any] = None,
+        result: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> Optional[StageSpan]:
+        span = self.open_spans.get(id_)
+        if span is not None and span.stage is not None:
+            stage_duration.observe(time.perf_counter() - span.start, stage=span.stage)
+        return span
+
+    def prepare_to_drop_span(
+        self,
+        id_: str,
+        bound_args: inspect.BoundArguments,
+        instance: Optional[Any] = None,
+        err: Optional[BaseException] = None,
+        **kwargs: Any,
+    ) -> Optional[StageSpan]:
+        span = self.open_spans.get(id_)
+        if span is not None and span.stage is not None:
+            stage_duration.observe(time.perf_counter() - span.start, stage=span.stage)
+            stage_errors.inc(stage=span.stage)
+        return span
+
+
+_handler: StageSpanHandler | None = None
+_install_lock = threading.Lock()
+
+
+def install() -> StageSpanHandler:
+    """Attach the handler to the root LlamaIndex dispatcher (once per process)."""
+    global _handler
+    with _install_lock:
+        if _handler is None:
+            _handler = StageSpanHandler()
+            get_dispatcher().add_span_handler(_handler)
+    return _handler
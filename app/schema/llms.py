@@ -1,16 +1,25 @@
 from pydantic import BaseModel
-from llama_index.core.base.llms.types import ChatResponse
 
 class Question(BaseModel):
     question: str
 
 
-class Answer(BaseModel):
-    answer: ChatResponse
+def __getattr__(name):
+    # Answer wraps a llama_index type; build it on first access so importing
+    # the schemas does not import llama_index
+    if name == "Answer":
+        from llama_index.core.base.llms.types import ChatResponse
+
+        class Answer(BaseModel):
+            answer: ChatResponse
+
+        globals()["Answer"] = Answer
+        return Answer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class StructuredResponse(BaseModel):
     """A song with name and artist."""
     name: str
     artist: str
-    
\ No newline at end of file
+    
\ No newline at end of file
@@ -20,3 +20,21 @@ class UserRead(UserBase):
 
     class Config:
         orm_mode = True
+
+
+class UserBulkUpdate(UserUpdate):
+    id: UUID
+
+
+class BulkConflict(BaseModel):
+    index: int
+    detail: str
+    id: UUID | None = None
+    email: str | None = None
+
+
+class BulkResult(BaseModel):
+    created: list[UUID] = []
+    updated: list[UUID] = []
+    deleted: list[UUID] = []
+    conflicts: list[BulkConflict] = []
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import aclosing
+from typing import TYPE_CHECKING
+import httpx
+from core import config
+
+if TYPE_CHECKING:
+    # llama_index / ollama take over a second to import; they are loaded on first use
+    from llama_index.core.llms import ChatMessage
+    from llama_index.embeddings.ollama import OllamaEmbedding
+    from llama_index.llms.ollama import Ollama
+
+
+class LLMGateway:
+    """
+    Long-lived access point to the Ollama backend.
+
+    One `Ollama` client (and so one keep-alive HTTP connection pool) is kept
+    per model, and structured-LLM wrappers are built once per
+    (model, output class) and reused by every request.
+    """
+
+    def __init__(
+        self,
+        base_url: str = config.OLLAMA_BASE_URL,
+        request_timeout: float = config.LLM_REQUEST_TIMEOUT,
+        max_connections: int = config.LLM_MAX_CONNECTIONS,
+        keepalive_expiry: float = config.LLM_KEEPALIVE_EXPIRY,
+    ):
+        self.base_url = base_url
+        self.request_timeout = request_timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._llms: dict[str, Ollama] = {}
+        self._structured = {}
+        self._embed_models: dict[str, OllamaEmbedding] = {}
+        self._warm: set[str] = set()
+        self._lock = asyncio.Lock()
+
+    def get_llm(self, model: str = config.CHAT_MODEL) -> Ollama:
+        llm = self._llms.get(model)
+        if llm is None:
+            from ollama import AsyncClient, Client
+            from llama_index.llms.ollama import Ollama
+            from rag import tracing
+
+            tracing.install()  # LLM spans feed stage_duration_seconds{stage="llm"}
+            llm = Ollama(
+                model=model,
+                base_url=self.base_url,
+                request_timeout=self.request_timeout,
+                client=Client(
+                    host=self.base_url, timeout=self.request_timeout, limits=self.limits
+                ),
+                async_client=AsyncClient(
+                    host=self.base_url, timeout=self.request_timeout, limits=self.limits
+                ),
+            )
+            self._llms[model] = llm
+        return llm
+
+    def get_structured_llm(self, output_cls, model: str = config.CHAT_MODEL):
+        key = (model, output_cls)
+        sllm = self._structured.get(key)
+        if sllm is None:
+            sllm = self.get_llm(model).as_structured_llm(output_cls)
+            self._structured[key] = sllm
+        return sllm
+
+    async def _ensure_ready(self, model: str):
+        # Ollama looks the context window up with a blocking `show` call the
+        # first time it is needed; do that once, off the event loop.
+        if model in self._warm:
+            return
+        async with self._lock:
+            if model not in self._warm:
+                await asyncio.to_thread(self.get_llm(model).get_context_window)
+                self._warm.add(model)
+
+    async def warm_up(self, model: str = config.CHAT_MODEL):
+        """Import the client libraries, open the pool and fetch model info before the first request."""
+        await asyncio.to_thread(self.get_llm, model)
+        await self._ensure_ready(model)
+
+    async def chat(
+        self,
+        messages: list[ChatMessage],
+        output_cls=None,
+        model: str = config.CHAT_MODEL,
+    ) -> str:
+        await self._ensure_ready(model)
+        if output_cls is None:
+            llm = self.get_llm(model)
+        else:
+            llm = self.get_structured_llm(output_cls, model=model)
+        resp = await llm.achat(messages=messages)
+        return resp.message.content
+
+    async def stream_chat(self, messages: list[ChatMessage], model: str = config.CHAT_MODEL):
+        """
+        Yield the reply token by token.
+
+        Closing this generator closes the LlamaIndex stream, whose upstream
+        HTTP response is then closed and Ollama stops generating.
+        """
+        await self._ensure_ready(model)
+        stream = await self.get_llm(model).astream_chat(messages)
+        async with aclosing(stream):
+            async for part in stream:
+                if part.delta:
+                    yield part.delta
+
+    def get_embed_model(self, model: str = config.EMBED_MODEL) -> OllamaEmbedding:
+        embed_model = self._embed_models.get(model)
+        if embed_model is None:
+            from llama_index.embeddings.ollama import OllamaEmbedding
+            from rag import tracing
+
+            tracing.install()
+            embed_model = OllamaEmbedding(model_name=model, base_url=self.base_url)
+            self._embed_models[model] = embed_model
+        return embed_model
+
+    async def embed(self, text: str, model: str = config.EMBED_MODEL) -> list[float]:
+        return await self.get_embed_model(model).aget_query_embedding(text)
+
+    async def aclose(self):
+        for llm in self._llms.values():
+            await llm.async_client._client.aclose()
+            llm.client._client.close()
+        self._llms.clear()
+        self._structured.clear()
+        self._embed_models.clear()
+        self._warm.clear()
+
+
+gateway = LLMGateway()
@@ -1,9 +1,25 @@
-from llama_index.llms.ollama import Ollama
-from llama_index.core.llms import ChatMessage
+import asyncio
+import time
+from contextlib import aclosing
 from schema.llms import StructuredResponse
+from services.llm_gateway import gateway
+from services.metrics import (
+    llm_generation_duration, llm_time_to_first_token, llm_tokens, llm_tokens_per_second, span
+)
+from services.response_cache import get_response_cache
+from services.single_flight import SingleFlight, flight_key
+from services.scheduler import Admission, SharedAdmission, scheduler
+from core import config
+
+
+# concurrent identical questions share one generation, queued under the
+# highest priority and latest deadline of the callers waiting for it
+flights = SingleFlight()
 
 
 def messages(query: str):
+    from llama_index.core.llms import ChatMessage  # deferred: keeps app import light
+
     message = [
     ChatMessage(
         role="user", content=query
@@ -12,14 +28,89 @@ def messages(query: str):
     return message
 
 
-def chat(query):
-    prompt = messages(query=query)
-    llm = Ollama(model="deepseek-r1:1.5b", request_timeout=120.0)
+def count_tokens(text: str) -> int:
+    # LlamaIndex's default tokenizer, not the model's: close enough for throughput
+    from llama_index.core.utils import get_tokenizer
+
+    return len(get_tokenizer()(text))
+
+
+async def generate(query: str, model: str = config.CHAT_MODEL, admission: Admission | None = None):
+    with span("prompt"):
+        prompt = messages(query=query)
+    async with scheduler.slot(model, admission):
+        start = time.perf_counter()  # queue time is already recorded under stage="queue"
+        answer = await gateway.chat(messages=prompt, output_cls=StructuredResponse, model=model)
+        duration = time.perf_counter() - start
+    tokens = count_tokens(answer)
+    llm_generation_duration.observe(duration, model=model)
+    llm_tokens.inc(tokens, model=model)
+    if tokens and duration > 0:
+        # no first-token timestamp here, so prefill is part of the rate
+        llm_tokens_per_second.observe(tokens / duration, model=model, mode="full")
+    return answer
+
+
+async def chat(query: str, model: str = config.CHAT_MODEL, admission: Admission | None = None):
+    key = flight_key(query, model)
+    if not config.RESPONSE_CACHE_ENABLED:
+        return await flights.do(
+            key, lambda shared: generate(query=query, model=model, admission=shared), SharedAdmission.of(admission)
+        )
+
+    response_cache = get_response_cache()
+    embedding = None
+    if response_cache.semantic_threshold:
+        embedding = await gateway.embed(query)
+    with span("cache"):
+        cached = await asyncio.to_thread(response_cache.get, query, model, embedding)
+    if cached is not None:
+        return cached
+
+    async def generate_and_store(shared: SharedAdmission):
+        answer = await generate(query=query, model=model, admission=shared)
+        await asyncio.to_thread(response_cache.put, query, model, answer, embedding)
+        return answer
+
+    return await flights.do(key, generate_and_store, SharedAdmission.of(admission))
 
-    song_resp = llm.as_structured_llm(StructuredResponse)
-    resp = song_resp.chat(messages=prompt)
 
-    return resp.message.content
-    
+async def stream_chat(query: str, model: str = config.CHAT_MODEL, admission: Admission | None = None):
+    """Yield `token` events as they arrive, then one `done` event with timings."""
+    key = flight_key(query, model)
+    stream = flights.stream(key, lambda shared: _stream_chat(query, model, shared), SharedAdmission.of(admission))
+    async with aclosing(stream):
+        async for event in stream:
+            yield event
 
 
+async def _stream_chat(query: str, model: str, admission: Admission | None):
+    with span("prompt"):
+        prompt = messages(query=query)
+    ttft = None
+    tokens = 0
+    async with scheduler.slot(model, admission):
+        start = time.perf_counter()  # queue time is already recorded under stage="queue"
+        # the stream bypasses LlamaIndex, so its span handler does not see it
+        with span("llm"):
+            async with aclosing(gateway.stream_chat(messages=prompt, model=model)) as stream:
+                async for delta in stream:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                        llm_time_to_first_token.observe(ttft, model=model)
+                        yield {"type": "ttft", "ttft_ms": round(ttft * 1000, 1)}
+                    tokens += 1
+                    yield {"type": "token", "content": delta}
+    duration = time.perf_counter() - start
+    generation = duration - (ttft or 0.0)
+    llm_generation_duration.observe(duration, model=model)
+    llm_tokens.inc(tokens, model=model)
+    if tokens > 1 and generation > 0:
+        llm_tokens_per_second.observe(tokens / generation, model=model, mode="stream")
+    yield {
+        "type": "done",
+        "ttft_ms": round((ttft or duration) * 1000, 1),
+        "duration_ms": round(duration * 1000, 1),
+        "tokens": tokens,
+        "tokens_per_sec": round(tokens / generation, 1) if generation > 0 else None,
+    }
@@ -0,0 +1,263 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds; covers a cached lookup (sub-ms) up to a long local generation
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), collect=None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect  # optional callable returning {label values: value} at scrape time
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._collect is not None:
+            values.update(self._collect())
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = []
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds every metric of the process and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, collect))
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response headers are sent",
+    ("method", "route", "status"),
+)
+stage_duration = registry.histogram(
+    "stage_duration_seconds",
+    "Time spent per request stage (queue, cache, embedding, retrieval, context, synthesis, llm)",
+    ("stage",),
+)
+stage_errors = registry.counter(
+    "stage_errors_total", "Stages that ended with an exception", ("stage",)
+)
+llm_time_to_first_token = registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from acquiring a generation slot to the first streamed token",
+    ("model",),
+)
+llm_tokens_per_second = registry.histogram(
+    "llm_tokens_per_second",
+    "Generation rate: after the first token when streamed (mode=stream), over the whole reply otherwise (mode=full)",
+    ("model", "mode"),
+    buckets=RATE_BUCKETS,
+)
+llm_generation_duration = registry.histogram(
+    "llm_generation_duration_seconds",
+    "Time from acquiring a generation slot to the last generated token",
+    ("model",),
+)
+llm_tokens = registry.counter(
+    "llm_tokens_total", "Generated tokens (stream deltas, or tokenizer count of a full reply)", ("model",)
+)
+stream_disconnects = registry.counter(
+    "http_stream_disconnects_total", "Streaming responses abandoned by the client", ("route",)
+)
+context_tokens = registry.counter(
+    "rag_context_tokens_total", "Retrieved context tokens, before and after context assembly", ("stage",)
+)
+context_chunks_dropped = registry.counter(
+    "rag_context_chunks_dropped_total", "Retrieved chunks left out of the prompt", ("reason",)
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("operation",)
+)
+
+
+def _scheduler_gauge(field: str):
+    def collect():
+        from services.scheduler import scheduler
+
+        return {(model,): stats[field] for model, stats in scheduler.stats()["models"].items()}
+
+    return collect
+
+
+llm_slots_limit = registry.gauge(
+    "llm_slots_limit", "Concurrent generations allowed per model", ("model",), _scheduler_gauge("limit")
+)
+llm_slots_running = registry.gauge(
+    "llm_slots_running", "Generations running per model", ("model",), _scheduler_gauge("running")
+)
+llm_queue_waiting = registry.gauge(
+    "llm_queue_waiting", "Requests queued for a generation slot", ("model",), _scheduler_gauge("waiting")
+)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block of work as one request stage: `with span("retrieval"): ...`."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage=stage)
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,218 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from core import config
+from prompt import normalize_prompt
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of chat answers.
+
+    Exact hits are keyed by sha256(model + normalized prompt). When
+    `semantic_threshold` is set and the caller passes an embedding, a miss
+    falls back to the most similar cached prompt for the same model whose
+    cosine similarity is >= the threshold. Entries expire after `ttl` seconds
+    and the least recently used ones are evicted once the stored size goes
+    over `max_bytes`. Hits only note their access time in memory; the
+    updates are written in one batch with the next `put` or after
+    `touch_batch` hits, so a hit never opens a write transaction of its own.
+    """
+
+    def __init__(
+        self,
+        path: str = config.RESPONSE_CACHE_PATH,
+        max_bytes: int = config.RESPONSE_CACHE_MAX_BYTES,
+        ttl: float = config.RESPONSE_CACHE_TTL,
+        semantic_threshold: float | None = config.RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+        touch_batch: int = 256,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold or None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.touch_batch = touch_batch
+        self._touched: dict[str, float] = {}  # key -> last access not yet written
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                embedding BLOB,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+        # model -> (keys, created_at, unit-normalized embedding matrix), rebuilt lazily
+        self._vectors: dict[str, tuple[list[str], "np.ndarray", "np.ndarray"]] = {}
+
+    @staticmethod
+    def make_key(prompt: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\x00{normalize_prompt(prompt)}".encode()).hexdigest()
+
+    def get(self, prompt: str, model: str, embedding: list[float] | None = None) -> str | None:
+        key = self.make_key(prompt, model)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                self._touch(key, now)
+                self.hits += 1
+                return row[0]
+
+            if self.semantic_threshold and embedding is not None:
+                match = self._nearest(model, embedding, now)
+                if match is not None:
+                    row = self._conn.execute(
+                        "SELECT answer, created_at FROM responses WHERE key = ?", (match,)
+                    ).fetchone()
+                    if row is not None and now - row[1] <= self.ttl:
+                        self._touch(match, now)
+                        self.semantic_hits += 1
+                        return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, prompt: str, model: str, answer: str, embedding: list[float] | None = None):
+        key = self.make_key(prompt, model)
+        blob = None
+        if embedding is not None:
+            import numpy as np  # only the semantic tier needs numpy
+
+            blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        size = len(prompt.encode()) + len(answer.encode()) + len(blob or b"")
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._flush_touches()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt, answer, blob, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+            self._vectors.pop(model, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._touched.clear()
+            self._vectors.clear()
+
+    def _touch(self, key: str, now: float):
+        self._touched[key] = now
+        if len(self._touched) >= self.touch_batch:
+            self._flush_touches()
+            self._conn.commit()
+
+    def _flush_touches(self):
+        # the caller commits; LRU eviction needs the batched access times first
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(now, key) for key, now in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self, now: float):
+        expired = self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+        self.evictions += expired
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            if expired:
+                self._vectors.clear()
+            return
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+        self._vectors.clear()
+
+    def _nearest(self, model: str, embedding: list[float], now: float) -> str | None:
+        """Most similar prompt of `model` that is above the threshold and not expired."""
+        import numpy as np
+
+        if model not in self._vectors:
+            keys, created, vectors = [], [], []
+            for key, created_at, blob in self._conn.execute(
+                "SELECT key, created_at, embedding FROM responses WHERE model = ? AND embedding IS NOT NULL",
+                (model,),
+            ):
+                keys.append(key)
+                created.append(created_at)
+                vectors.append(np.frombuffer(blob, dtype=np.float32))
+            matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+            if len(matrix):
+                matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            self._vectors[model] = (keys, np.asarray(created, dtype=np.float64), matrix)
+
+        keys, created, matrix = self._vectors[model]
+        query = np.asarray(embedding, dtype=np.float32)
+        if not keys or matrix.shape[1] != query.shape[0]:
+            return None
+        scores = matrix @ (query / (np.linalg.norm(query) + 1e-12))
+        scores[now - created > self.ttl] = -np.inf  # an expired best match must not hide a valid one
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.semantic_threshold else None
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache, opened on first use rather than at import time."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,244 @@
+import asyncio
+import math
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+from services.metrics import stage_duration
+from core import config
+
+
+class Overloaded(Exception):
+    """The wait queue for a model is full; retry after `retry_after` seconds."""
+
+    def __init__(self, model: str, retry_after: int):
+        super().__init__(f"model {model} is overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before the request reached the model."""
+
+
+@dataclass
+class Admission:
+    client_id: str = "anonymous"
+    priority: int = 0  # higher is served first
+    deadline: float | None = None  # event loop time (`loop.time()`)
+
+    def remaining(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return self.deadline - asyncio.get_running_loop().time()
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+@dataclass
+class SharedAdmission(Admission):
+    """
+    Ticket of one generation shared by several callers (single-flight).
+
+    It carries the highest priority and the latest deadline of every caller
+    that joined, so nobody inherits the first caller's shorter deadline or
+    lower priority; each caller still enforces its own deadline around the
+    wait. Joining while the work is queued moves it to its new priority.
+    """
+
+    _on_change: Callable[[], None] | None = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def of(cls, admission: Admission | None) -> "SharedAdmission":
+        admission = admission or Admission()
+        return cls(client_id=admission.client_id, priority=admission.priority, deadline=admission.deadline)
+
+    def join(self, admission: Admission | None):
+        admission = admission or Admission()
+        priority = max(self.priority, admission.priority)
+        deadline = None if self.deadline is None or admission.deadline is None else max(self.deadline, admission.deadline)
+        if (priority, deadline) != (self.priority, self.deadline):
+            self.priority, self.deadline = priority, deadline
+            if self._on_change is not None:
+                self._on_change()
+
+
+class _Waiter:
+    def __init__(self, admission: Admission):
+        self.admission = admission
+        self.priority = admission.priority  # bucket it is queued in
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class _ModelQueue:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        self.waiting = 0
+        # priority -> client_id -> waiters; clients are served round-robin
+        self.queues: dict[int, OrderedDict[str, deque[_Waiter]]] = {}
+        # moving average of how long a slot is held, used for Retry-After
+        self.avg_service_time = 1.0
+
+    def push(self, waiter: _Waiter):
+        waiter.priority = waiter.admission.priority
+        clients = self.queues.setdefault(waiter.priority, OrderedDict())
+        clients.setdefault(waiter.admission.client_id, deque()).append(waiter)
+        self.waiting += 1
+
+    def remove(self, waiter: _Waiter):
+        clients = self.queues.get(waiter.priority, {})
+        waiters = clients.get(waiter.admission.client_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self.waiting -= 1
+            if not waiters:
+                del clients[waiter.admission.client_id]
+
+    def pop(self) -> _Waiter | None:
+        for priority in sorted(self.queues, reverse=True):
+            clients = self.queues[priority]
+            while clients:
+                client_id, waiters = next(iter(clients.items()))
+                waiter = waiters.popleft()
+                self.waiting -= 1
+                if waiters:
+                    clients.move_to_end(client_id)
+                else:
+                    del clients[client_id]
+                if waiter.admission.expired():
+                    # the caller already gave up; never send it to the model
+                    waiter.future.set_exception(DeadlineExceeded())
+                    continue
+                return waiter
+        return None
+
+
+class AdmissionScheduler:
+    """
+    Admission control in front of the Ollama backend.
+
+    Each model runs at most `limit` generations at once. Extra requests wait
+    in a bounded queue ordered by priority, then round-robin across clients
+    so one busy client cannot starve the others. When the queue is full the
+    request is rejected straight away with `Overloaded`, and requests whose
+    deadline passes while queued are dropped with `DeadlineExceeded`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+        max_queue: int = config.LLM_MAX_QUEUE,
+        model_limits: dict[str, int] | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.model_limits = model_limits or config.LLM_MODEL_CONCURRENCY
+        self.rejected = 0
+        self.expired = 0
+        self._models: dict[str, _ModelQueue] = {}
+
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._models.get(model)
+        if queue is None:
+            limit = self.model_limits.get(model, self.max_concurrency)
+            queue = self._models[model] = _ModelQueue(limit)
+        return queue
+
+    def retry_after(self, model: str) -> int:
+        queue = self._queue(model)
+        return max(1, math.ceil((queue.waiting / queue.limit + 1) * queue.avg_service_time))
+
+    async def acquire(self, model: str, admission: Admission):
+        queue = self._queue(model)
+        if admission.expired():
+            self.expired += 1
+            raise DeadlineExceeded()
+        if queue.running < queue.limit and not queue.waiting:
+            queue.running += 1
+            return
+        if queue.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(model, self.retry_after(model))
+
+        waiter = _Waiter(admission)
+        queue.push(waiter)
+        if isinstance(admission, SharedAdmission):
+            admission._on_change = lambda: self._requeue(queue, waiter)
+        try:
+            while True:
+                try:
+                    # the slot is handed over by `release`, which bumps `running` for us
+                    await asyncio.wait_for(asyncio.shield(waiter.future), admission.remaining())
+                    break
+                except asyncio.TimeoutError:
+                    if admission.expired():
+                        raise
+                    # a caller that joined shared work pushed the deadline back
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            self.expired += 1
+            self._abandon(queue, waiter)
+            raise DeadlineExceeded()
+        except asyncio.CancelledError:
+            self._abandon(queue, waiter)
+            raise
+        finally:
+            if isinstance(admission, SharedAdmission):
+                admission._on_change = None
+
+    def _requeue(self, queue: _ModelQueue, waiter: _Waiter):
+        if not waiter.future.done() and waiter.priority != waiter.admission.priority:
+            queue.remove(waiter)
+            queue.push(waiter)
+
+    def _abandon(self, queue: _ModelQueue, waiter: _Waiter):
+        queue.remove(waiter)
+        if waiter.future.done() and waiter.future.exception() is None:
+            # we were granted a slot in the same tick we gave up; pass it on
+            self._hand_over(queue)
+        elif not waiter.future.done():
+            waiter.future.cancel()
+
+    def release(self, model: str, held_for: float | None = None):
+        queue = self._queue(model)
+        if held_for is not None:
+            queue.avg_service_time = 0.8 * queue.avg_service_time + 0.2 * held_for
+        self._hand_over(queue)
+
+    def _hand_over(self, queue: _ModelQueue):
+        waiter = queue.pop()
+        if waiter is None:
+            queue.running -= 1
+        else:
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, model: str, admission: Admission | None = None):
+        loop = asyncio.get_running_loop()
+        queued = loop.time()
+        await self.acquire(model, admission or Admission())
+        start = loop.time()
+        stage_duration.observe(start - queued, stage="queue")
+        try:
+            yield
+        finally:
+            self.release(model, held_for=loop.time() - start)
+
+    def stats(self) -> dict:
+        return {
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "models": {
+                model: {
+                    "limit": queue.limit,
+                    "running": queue.running,
+                    "waiting": queue.waiting,
+                    "avg_service_time": round(queue.avg_service_time, 3),
+                }
+                for model, queue in self._models.items()
+            },
+        }
+
+
+scheduler = AdmissionScheduler()
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from contextlib import aclosing
+from prompt import normalize_prompt
+
+
+def flight_key(prompt: str, model: str) -> str:
+    return f"{model}\x00{normalize_prompt(prompt)}"
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key.
+
+    The first caller starts the work in its own task; callers that arrive
+    while it is in flight await the same task instead of starting another
+    generation. A follower disconnecting never cancels the shared work.
+
+    With a `context` (anything with `join(other)`, e.g. a `SharedAdmission`)
+    the leader runs `fn(context)` and every follower's context is joined
+    into the leader's for as long as the work is in flight.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+        self._contexts: dict[str, object] = {}
+        self._streams: dict[str, "_Broadcast"] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn, context=None):
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn() if context is None else fn(context))
+            self._calls[key] = task
+            if context is not None:
+                self._contexts[key] = context
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.followers += 1
+            if context is not None and key in self._contexts:
+                self._contexts[key].join(context)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._calls.pop(key, None)
+        self._contexts.pop(key, None)
+        if not task.cancelled():
+            # every waiter may have timed out already; mark the error as seen
+            task.exception()
+
+    async def stream(self, key: str, fn, context=None):
+        """
+        Share one async generator between concurrent subscribers.
+
+        Late subscribers replay the items produced so far and then follow
+        live. The upstream generator is cancelled once every subscriber
+        has gone away. `context` works as in `do`.
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.leaders += 1
+            source = fn() if context is None else fn(context)
+            broadcast = _Broadcast(source, on_done=lambda b: self._forget_stream(key, b), context=context)
+            self._streams[key] = broadcast
+        else:
+            self.followers += 1
+            if context is not None and broadcast.context is not None:
+                broadcast.context.join(context)
+        async with aclosing(broadcast.subscribe()) as items:
+            async for item in items:
+                yield item
+
+    def _forget_stream(self, key: str, broadcast: "_Broadcast"):
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
+
+
+class _Broadcast:
+    def __init__(self, source, on_done, context=None):
+        self.context = context
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._on_done = on_done
+        self._task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source):
+        try:
+            async with aclosing(source):
+                async for item in source:
+                    self.items.append(item)
+                    self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._on_done(self)
+            self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self):
+        self.subscribers += 1
+        i = 0
+        try:
+            while True:
+                while i < len(self.items):
+                    yield self.items[i]
+                    i += 1
+                if self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.finished:
+                # nobody is listening any more: stop the upstream generation
+                self._on_done(self)
+                self._task.cancel()
+
+
+class SyncSingleFlight:
+    """Thread-based variant of `SingleFlight.do` for blocking callers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, "_Call"] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
@@ -0,0 +1,91 @@
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from core import config
+from services.single_flight import SingleFlight
+
+
+class ToolCache:
+    """
+    TTL + LRU memoization of agent tool results.
+
+    Keys are the tool name plus its arguments as canonical JSON, so
+    `weather_today(city_name="Cairo")` asked twice within `ttl` seconds only
+    runs once. Concurrent identical calls share one in-flight execution, and
+    exceptions are never cached. The least recently used results are evicted
+    beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = config.TOOL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._flights = SingleFlight()
+
+    @staticmethod
+    def make_key(name: str, kwargs: dict) -> str:
+        return name + "\x00" + json.dumps(kwargs, sort_keys=True, default=str)
+
+    def get(self, key: str):
+        """Return (found, value)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def memoize(self, name: str, ttl: float):
+        """Decorator for async tool functions called with keyword arguments."""
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(**kwargs):
+                key = self.make_key(name, kwargs)
+                found, value = self.get(key)
+                if found:
+                    return value
+
+                async def run():
+                    result = await fn(**kwargs)
+                    self.put(key, result, ttl)
+                    return result
+
+                return await self._flights.do(key, run)
+
+            return wrapper
+
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+tool_cache = ToolCache()
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID
+from core import config
+from schema.users import UserRead
+
+_MISSING = object()
+
+
+class UserCache:
+    """
+    Bounded in-process read-through cache of `UserRead` by id.
+
+    Found users are kept for `ttl` seconds, ids that are not in the table
+    for the much shorter `negative_ttl`. The least recently used entries are
+    evicted beyond `max_entries`. Every write path calls `invalidate`; a
+    lookup that started before an invalidation does not store its (possibly
+    stale) result, so a reader racing a writer can never re-insert the old row.
+    Writes made by other processes are only picked up when entries expire.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.USER_CACHE_SIZE,
+        ttl: float = config.USER_CACHE_TTL,
+        negative_ttl: float = config.USER_CACHE_NEGATIVE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[UUID, tuple[float, object]] = OrderedDict()
+
+    def lookup(self, user_id: UUID):
+        """Return (found, value, token): value is a UserRead or None for a known-missing id."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                if entry[1] is _MISSING:
+                    self.negative_hits += 1
+                    return True, None, self.invalidations
+                self.hits += 1
+                return True, entry[1], self.invalidations
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return False, None, self.invalidations
+
+    def store(self, user_id: UUID, user: UserRead | None, token: int):
+        with self._lock:
+            if token != self.invalidations:
+                return  # a write happened while we were reading the database
+            ttl = self.ttl if user is not None else self.negative_ttl
+            self._entries[user_id] = (time.monotonic() + ttl, _MISSING if user is None else user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_missing(self, user_id: UUID) -> bool:
+        """True when the id is cached as not existing (lets PATCH/DELETE 404 without a query)."""
+        found, user, _ = self.lookup(user_id)
+        return found and user is None
+
+    def invalidate(self, *user_ids: UUID):
+        with self._lock:
+            self.invalidations += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+user_cache = UserCache()
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.database import Base  # noqa: E402
+from models.users import Users  # noqa: E402,F401  (registers the table on Base)
+from services.user_cache import user_cache  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database, with an empty user cache."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    user_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+        user_cache.clear()
@@ -0,0 +1,79 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+import crud.users as users
+from schema.users import UserBulkUpdate, UserCreate, UserRead, UserUpdate
+from services.user_cache import user_cache
+
+
+def make(db, name, email):
+    return users.create_user(db, UserCreate(name=name, email=email))
+
+
+def cached_read(db, user_id):
+    """Read twice so the second read is served from the cache."""
+    users.get_user_read(db, user_id)
+    hits = user_cache.hits + user_cache.negative_hits
+    user = users.get_user_read(db, user_id)
+    assert user_cache.hits + user_cache.negative_hits == hits + 1
+    return user
+
+
+def test_read_is_cached(db):
+    ann = make(db, "ann", "ann@example.com")
+    assert cached_read(db, ann.id).name == "ann"
+
+
+def test_read_after_update_is_fresh(db):
+    ann = make(db, "ann", "ann@example.com")
+    cached_read(db, ann.id)
+    users.update_user(db, ann.id, UserUpdate(name="ann renamed"))
+    assert users.get_user_read(db, ann.id).name == "ann renamed"
+
+
+def test_read_after_delete_is_fresh(db):
+    ann = make(db, "ann", "ann@example.com")
+    cached_read(db, ann.id)
+    users.user_delete(ann.id, db)
+    assert users.get_user_read(db, ann.id) is None
+
+
+def test_read_after_bulk_update_is_fresh(db):
+    ann = make(db, "ann", "ann@example.com")
+    cached_read(db, ann.id)
+    users.bulk_update_users(db, [UserBulkUpdate(id=ann.id, email="ann@example.org")])
+    assert users.get_user_read(db, ann.id).email == "ann@example.org"
+
+
+def test_read_after_upsert_is_fresh(db):
+    ann = make(db, "ann", "ann@example.com")
+    cached_read(db, ann.id)
+    users.bulk_create_users(db, [UserCreate(name="ann renamed", email="ann@example.com")], upsert=True)
+    assert users.get_user_read(db, ann.id).name == "ann renamed"
+
+
+def test_read_after_bulk_delete_is_fresh(db):
+    ann = make(db, "ann", "ann@example.com")
+    cached_read(db, ann.id)
+    users.bulk_delete_users(db, [ann.id])
+    assert users.get_user_read(db, ann.id) is None
+
+
+def test_missing_id_is_cached_and_short_circuits_writes(db):
+    missing = uuid.uuid4()
+    assert cached_read(db, missing) is None
+    with pytest.raises(HTTPException) as error:
+        users.update_user(db, missing, UserUpdate(name="nobody"))
+    assert error.value.status_code == 404
+
+
+def test_lookup_racing_a_write_does_not_store_the_old_row(db):
+    ann = make(db, "ann", "ann@example.com")
+    found, _, token = user_cache.lookup(ann.id)
+    assert not found
+    stale = UserRead.model_validate(ann, from_attributes=True)
+    users.update_user(db, ann.id, UserUpdate(name="ann renamed"))
+    user_cache.store(ann.id, stale, token)  # the reader finishes after the writer invalidated
+    assert users.get_user_read(db, ann.id).name == "ann renamed"
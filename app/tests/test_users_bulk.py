@@ -0,0 +1,87 @@
+import uuid
+
+import crud.users as users
+from models.users import Users
+from schema.users import UserBulkUpdate, UserCreate
+
+
+def make(db, name, email):
+    return users.create_user(db, UserCreate(name=name, email=email))
+
+
+def test_bulk_create_reports_taken_and_duplicate_emails(db):
+    make(db, "ann", "ann@example.com")
+    result = users.bulk_create_users(db, [
+        UserCreate(name="bob", email="bob@example.com"),
+        UserCreate(name="ann2", email="ann@example.com"),
+        UserCreate(name="bob2", email="bob@example.com"),
+    ])
+    assert len(result.created) == 1
+    assert [(c.index, c.detail) for c in result.conflicts] == [
+        (1, "email already registered"),
+        (2, "duplicate email in batch"),
+    ]
+    assert db.query(Users).count() == 2
+
+
+def test_bulk_create_falls_back_row_by_row_on_integrity_error(db, monkeypatch):
+    make(db, "ann", "ann@example.com")
+    # a concurrent writer took the email after the pre-check: the executemany trips the unique index
+    monkeypatch.setattr(users, "_existing", lambda db, column, values: {})
+    result = users.bulk_create_users(db, [
+        UserCreate(name="bob", email="bob@example.com"),
+        UserCreate(name="ann2", email="ann@example.com"),
+        UserCreate(name="cid", email="cid@example.com"),
+    ])
+    assert len(result.created) == 2
+    assert [(c.index, c.email, c.detail) for c in result.conflicts] == [
+        (1, "ann@example.com", "email already registered"),
+    ]
+    emails = {user.email: user.name for user in db.query(Users)}
+    assert emails == {"ann@example.com": "ann", "bob@example.com": "bob", "cid@example.com": "cid"}
+
+
+def test_bulk_create_upsert_updates_existing_rows(db):
+    ann = make(db, "ann", "ann@example.com")
+    result = users.bulk_create_users(db, [
+        UserCreate(name="ann renamed", email="ann@example.com"),
+        UserCreate(name="bob", email="bob@example.com"),
+    ], upsert=True)
+    assert result.updated == [ann.id]
+    assert len(result.created) == 1
+    assert result.conflicts == []
+    db.expire_all()
+    assert db.get(Users, ann.id).name == "ann renamed"
+    assert db.query(Users).count() == 2
+
+
+def test_bulk_update_falls_back_row_by_row_on_integrity_error(db, monkeypatch):
+    ann = make(db, "ann", "ann@example.com")
+    bob = make(db, "bob", "bob@example.com")
+    real_existing = users._existing
+    # ids are still looked up, but the email pre-check misses bob's address
+    monkeypatch.setattr(
+        users, "_existing", lambda db, column, values: {} if column is Users.email else real_existing(db, column, values)
+    )
+    result = users.bulk_update_users(db, [
+        UserBulkUpdate(id=ann.id, email="bob@example.com"),
+        UserBulkUpdate(id=bob.id, name="robert"),
+    ])
+    assert result.updated == [bob.id]
+    assert [(c.index, c.detail) for c in result.conflicts] == [(0, "email already registered")]
+    db.expire_all()
+    assert db.get(Users, ann.id).email == "ann@example.com"
+    assert db.get(Users, bob.id).name == "robert"
+
+
+def test_bulk_delete_reports_unknown_and_duplicate_ids(db):
+    ann = make(db, "ann", "ann@example.com")
+    bob = make(db, "bob", "bob@example.com")
+    missing = uuid.uuid4()
+    result = users.bulk_delete_users(db, [ann.id, missing, ann.id])
+    assert result.deleted == [ann.id]
+    assert [(c.index, c.id, c.detail) for c in result.conflicts] == [
+        (1, missing, "user not found"),
+        (2, ann.id, "duplicate id in batch"),
+    ]
+    assert [user.id for user in db.query(Users)] == [bob.id]
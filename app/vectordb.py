@@ -1,4 +1,7 @@
 # Step 1: Import necessary libraries
+import asyncio
+import os
+import threading
 import chromadb  # Chroma DB is used for persistent vector storage
 from watchdog.observers import Observer  # For watching filesystem events (e.g., file changes)
 from watchdog.events import FileSystemEventHandler  # To define custom responses to file changes
@@ -14,20 +17,37 @@ from llama_index.core import (
 from llama_index.embeddings.ollama import OllamaEmbedding  # Generates embeddings using Ollama
 from llama_index.llms.ollama import Ollama  # Language model from Ollama
 from llama_index.core.settings import Settings  # Used to configure global LlamaIndex settings
+from llama_index.core.schema import MetadataMode  # Controls which text of a node gets embedded
+from services.single_flight import SyncSingleFlight, flight_key  # Share one answer between identical concurrent queries
+from rag.manifest import FileChanges, IndexManifest, chunk_id, diff_chunks, file_hash  # Tracks which files/chunks are already embedded
+from rag.streaming import iter_file_chunks, read_documents, windows  # One text source for eager and bounded-memory ingestion
+from rag.chunking import chunk_documents  # Chunks follow paragraphs, so an edit only re-embeds what it touched
+from rag.rebuild import RebuildQueue  # Debounces watcher events into background rebuilds
+from rag.embed_cache import CachedEmbedding  # Persistent (model, text hash) -> vector cache
+from rag.pipeline import IngestionPipeline  # Process-pool parse -> chunk -> embed -> upsert for whole folders
+from rag.mmap_store import MmapVectorStore  # In-process memory-mapped alternative to Chroma
+from rag.query_cache import CachedRetriever, QueryCache  # Query-embedding and retrieval LRUs, reset on rebuild
+from rag.context import ContextAssembler  # Dedup, trim and token-budget retrieved chunks before synthesis
+from llama_index.core.query_engine import RetrieverQueryEngine  # Answers questions over a retriever
+from rag import tracing  # Times embedding / retrieval / synthesis / LLM spans for /metrics
+from core import config
 
 # TODO complete
 # this is a test
 # Step 3: Define a class that watches a directory or file for changes
 class DataDirWatcher(FileSystemEventHandler):
-    def __init__(self, callback):  # Accept a callback function to trigger on file change
+    def __init__(self, callback):  # Accept a callback function called with each changed path
         super().__init__()
         self.callback = callback
 
     def on_any_event(self, event):  # Called whenever any change happens
-        # Ignore directory changes and temp file edits (like swap files)
-        if not event.is_directory and not event.src_path.endswith(("~", ".swp")):
-            print(f"[watcher] Detected change: {event.event_type} - {event.src_path}")
-            self.callback()  # Run the callback (e.g., rebuild the index)
+        # Ignore directory changes, plain reads (our own rebuild opens the files) and temp file edits
+        if event.is_directory or event.event_type in ("opened", "closed_no_write"):
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):  # Moves touch two paths
+            if path and not path.endswith(("~", ".swp")):
+                print(f"[watcher] Detected change: {event.event_type} - {path}")
+                self.callback(path)  # Only queue the path; the rebuild runs on a background worker
 
 
 # Step 4: Define the main class to handle Chroma + LlamaIndex logic
@@ -37,57 +57,300 @@ class ChromaLlamaIndexer:
     def __init__(self, 
                 llm_model="llama3.2",  # Set the model name to use with Ollama
                 chroma_dir="./chroma_db",  # Directory to store Chroma DB
-                collection_name="default"):  # Chroma collection name
+                collection_name="default",  # Chroma collection name
+                embed_backend="ollama",  # "ollama" (HTTP server) or "minilm" (in-process CPU engine)
+                vector_backend="chroma",  # "chroma" (PersistentClient) or "mmap" (NumPy over a memory-mapped matrix)
+                base_url=config.OLLAMA_BASE_URL,  # Ollama server for both the LLM and the embeddings
+                reader_cls=UnstructuredReader,  # File parser; anything with load_data(file=...) -> documents
+                streaming=config.STREAM_INGEST,  # Chunk, embed and upsert each file in fixed-size windows
+                context_assembly=config.CONTEXT_ASSEMBLY,  # Dedup/trim/budget the retrieved chunks before they reach the LLM
+                similarity_top_k=config.RETRIEVAL_TOP_K):  # Chunks retrieved per query
 
-        self.embedding_model = OllamaEmbedding(model_name=llm_model)  # Create embedding model
-        self.model = Ollama(model=llm_model)  # Create the language model
-
-        self.chroma_client = chromadb.PersistentClient(path=chroma_dir)  # Connect to persistent Chroma DB
-        self.collection_name = self.chroma_client.get_or_create_collection(
-            name=collection_name  # Create/get Chroma collection
-        )
+        self.llm_model = llm_model
+        self.reader_cls = reader_cls
+        self.streaming = streaming
+        self.similarity_top_k = similarity_top_k
+        tracing.install()  # Per-stage latencies end up in stage_duration_seconds
+        if embed_backend == "minilm":
+            from embed import MiniLMEmbedding  # Imported lazily: pulls in torch/transformers
+            self.embedding_model = MiniLMEmbedding()  # Micro-batched local embeddings, no HTTP round-trip
+        else:
+            self.embedding_model = OllamaEmbedding(model_name=llm_model, base_url=base_url)  # Create embedding model
+        if config.EMBED_CACHE_ENABLED:
+            self.embedding_model = CachedEmbedding(self.embedding_model)  # Never embed the same text twice
+        self.model = Ollama(model=llm_model, base_url=base_url)  # Create the language model
 
         # Configure LlamaIndex to use Ollama models
         Settings.llm = self.model
         Settings.embed_model = self.embedding_model
 
         # Set up the vector store interface
-        self.vector_store = ChromaVectorStore(chroma_collection=self.collection_name)
+        if vector_backend == "mmap":
+            # No client, no SQLite on the query path; vectors live in chroma_dir/mmap/<collection>
+            self.chroma_client = self.collection_name = None
+            self.vector_store = MmapVectorStore(
+                path=os.path.join(chroma_dir, "mmap", collection_name),
+                dtype=config.MMAP_STORE_DTYPE,
+                ivf_lists=config.MMAP_STORE_IVF_LISTS,
+                nprobe=config.MMAP_STORE_NPROBE,
+            )
+        else:
+            self.chroma_client = chromadb.PersistentClient(path=chroma_dir)  # Connect to persistent Chroma DB
+            self.collection_name = self.chroma_client.get_or_create_collection(
+                name=collection_name  # Create/get Chroma collection
+            )
+            self.vector_store = ChromaVectorStore(chroma_collection=self.collection_name)
 
         # Create storage context for saving and retrieving index data
         self.storage_context = StorageContext.from_defaults(vector_store=self.vector_store)
 
+        # Manifest of already-embedded files and chunks, kept next to chroma_db
+        self.manifest = IndexManifest.for_collection(
+            chroma_dir, collection_name if vector_backend == "chroma" else f"{collection_name}.{vector_backend}"
+        )
+        if self._count() == 0 and self.manifest.files:
+            self.manifest.clear()  # The collection was wiped, so nothing is really embedded
+
         # Initialize index and query engine to None
         self.index = None
         self.query_engine = None
 
-    # Step 4.2: Build or rebuild the index from a data file
-    def build_index(self, data_path):
-        print(f"[indexer] Loading documents from {data_path}…")
-        
-        # Option A (commented out): load all files from a folder
-        # docs = SimpleDirectoryReader(data_path).load_data()
-
-        # Option B (active): load a single file using UnstructuredReader
-        loader = UnstructuredReader()
-        docs = loader.load_data(file=data_path)
-
-        # Create a new vector index from the loaded documents
-        self.index = VectorStoreIndex.from_documents(
-            documents=docs, 
-            storage_context=self.storage_context
+        # Repeated queries skip embedding and vector search; every rebuild starts a new cache generation
+        self.query_cache = QueryCache()
+
+        # Concurrent identical queries wait on one in-flight query instead of each running its own
+        self.flights = SyncSingleFlight()
+
+        # Only one rebuild at a time may write to the collection and the manifest
+        self._write_lock = threading.Lock()
+
+        # Shorter prompts: near-duplicate chunks dropped, chunks cut to their relevant sentences, total capped
+        self.context_assembler = ContextAssembler(embed_model=self.embedding_model) if context_assembly else None
+
+    # Number of chunks currently stored, whichever backend holds them
+    def _count(self):
+        if isinstance(self.vector_store, MmapVectorStore):
+            return len(self.vector_store)
+        return self.collection_name.count()
+
+    # Step 4.2: Build or rebuild the index from a data file (or a folder of files)
+    def build_index(self, data_path, incremental=True):
+        if not incremental:
+            return self._full_build(data_path)
+
+        print(f"[indexer] Syncing documents from {data_path}…")
+        files = list_files(data_path)
+        return self._sync(files, self._gone(data_path, files))
+
+    # Step 4.2.1: Re-index only the given paths (called by the background rebuild worker)
+    def update_files(self, paths):
+        paths = {os.path.abspath(path) for path in paths}
+        files = sorted(path for path in paths if os.path.isfile(path))
+        gone = [path for path in paths if not os.path.exists(path) and path in self.manifest.files]
+        print(f"[indexer] Updating {len(files)} changed and {len(gone)} deleted file(s)…")
+        return self._sync(files, gone)
+
+    # Step 4.2.1b: Ingest a whole folder with the parallel pipeline (many files, all cores)
+    def ingest_directory(self, data_dir, workers=None, **pipeline_options):
+        files = list_files(data_dir)
+        print(f"[indexer] Ingesting {len(files)} files from {data_dir} in parallel…")
+        pipeline_options.setdefault("reader_cls", self.reader_cls)  # Parsed in worker processes, so it must be picklable
+        pipeline = IngestionPipeline(self, workers=workers, **pipeline_options)
+        report = asyncio.run(pipeline.run(files))
+        with self._write_lock:
+            gone = self._gone(data_dir, files)
+            report["deleted_chunks"] = self._remove_files(gone)
+            self.manifest.save()
+            self._swap_query_engine()
+        return report
+
+    def _sync(self, files, gone):
+        if self.streaming:
+            stats = {"embedded": 0, "deleted": 0, "unchanged": 0}
+            for source in files:
+                result = self._stream_file(source)  # Writes as it goes; nothing of the file is kept afterwards
+                if result is None:
+                    stats["unchanged"] += 1
+                else:
+                    stats["embedded"] += result["embedded"]
+                    stats["deleted"] += result["deleted"]
+            with self._write_lock:
+                stats["deleted"] += self._remove_files(gone)
+                self.manifest.save()
+                self._swap_query_engine()
+        else:
+            # Parse and embed first, outside the lock; this is the slow part
+            changes, unchanged = self._prepare(files)
+            stats = self.apply_changes(changes, gone=gone, publish=True)  # One lock: no rebuild can interleave
+            stats["unchanged"] = unchanged
+
+        print(
+            f"[indexer] Index synced: {stats['embedded']} chunks embedded, "
+            f"{stats['deleted']} deleted, {stats['unchanged']} files unchanged."
         )
+        return stats
+
+    # Step 4.2.1c: Write already-embedded changes to Chroma and the manifest, drop the chunks of
+    # deleted files and (with publish) refresh the query engine, all under one acquisition of the lock
+    def apply_changes(self, changes, gone=(), publish=False):
+        stats = {"embedded": 0, "deleted": 0}
+        with self._write_lock:
+            new_nodes = [node for change in changes for node in change.new_nodes]
+            stale = [cid for change in changes for cid in change.stale]
+            stale += [cid for source in gone for cid in self.manifest.chunks(source)]
+            self._replace_chunks(new_nodes, stale)  # New and stale chunks of an edited file change together
+            for change in changes:
+                self.manifest.set_file(change.source, change.digest, change.chunk_ids)
+            for source in gone:
+                self.manifest.remove_file(source)
+            self.manifest.save()
+            if publish:
+                self._swap_query_engine()
+            stats["embedded"] += len(new_nodes)
+            stats["deleted"] += len(stale)
+        return stats
 
-        # Create a query engine to allow natural language queries
-        self.query_engine = self.index.as_query_engine()
+    # Write new chunks and drop stale ones: one commit on the mmap store, so a query never sees both
+    # versions of an edited paragraph. Chroma has no multi-call transaction; there the delete follows
+    # the add straight away under the same write lock, a much shorter window than the whole sync.
+    def _replace_chunks(self, new_nodes, stale):
+        if isinstance(self.vector_store, MmapVectorStore):
+            self.vector_store.replace(new_nodes, stale)
+            return
+        if new_nodes:
+            self.vector_store.add(new_nodes)
+        if stale:
+            self.vector_store.delete_nodes(node_ids=stale)
 
-        print(f"[indexer] Index built: {len(docs)} documents ingested.")
+    # Files the manifest knows about under data_path that no longer exist
+    def _gone(self, data_path, files):
+        scope = os.path.abspath(data_path)
+        files = set(files)
+        return [
+            source for source in self.manifest.files
+            if source not in files and (source == scope or source.startswith(scope + os.sep))
+        ]
+
+    # Step 4.2.2: Re-embed everything from scratch: drop every tracked chunk, then a normal sync
+    def _full_build(self, data_path):
+        print(f"[indexer] Rebuilding the index of {data_path} from scratch…")
+        with self._write_lock:
+            removed = self._remove_files(list(self.manifest.files))  # Nothing is left behind to duplicate
+            self.manifest.save()
+        stats = self._sync(list_files(data_path), [])
+        stats["deleted"] += removed
+        return stats
+
+    # Step 4.2.3: Work out what changed in each file and embed only new chunks
+    def _prepare(self, files):
+        changes = []
+        unchanged = 0
+        for source in files:
+            digest = file_hash(source)
+            if self.manifest.file_hash(source) == digest:
+                unchanged += 1  # Same bytes as last time: skip parsing entirely
+                continue
+
+            docs = read_documents(source, self.reader_cls)  # Plain text from disk, like the streaming path
+            nodes = chunk_documents(docs, source)  # Paragraph-anchored: later chunks keep their ids after an edit
+
+            # Content-hash ids: unchanged paragraphs keep the id they already have in Chroma
+            change = diff_chunks(FileChanges(source, digest), nodes, self.manifest.chunks(source))
+            if change.new_nodes:
+                embeddings = self.embedding_model.get_text_embedding_batch(
+                    [node.get_content(metadata_mode=MetadataMode.EMBED) for node in change.new_nodes]
+                )
+                for node, embedding in zip(change.new_nodes, embeddings):
+                    node.embedding = embedding
+            changes.append(change)
+        return changes, unchanged
+
+    # Step 4.2.3b: Streaming variant of _prepare + apply_changes for one file, one window of chunks at a time
+    def _stream_file(self, source, window=config.STREAM_WINDOW_CHUNKS):
+        digest = file_hash(source)
+        if self.manifest.file_hash(source) == digest:
+            return None  # Same bytes as last time: skip parsing entirely
+
+        known = self.manifest.chunks(source)
+        seen = {}  # Chunk ids of the new version of the file, in order (ids only, never the text)
+        embedded = 0
+        chunks = iter_file_chunks(source, reader_cls=self.reader_cls)  # Same paragraph chunks as _prepare
+        for batch in windows(chunks, window):
+            new_nodes = []
+            for node in batch:
+                node.id_ = chunk_id(source, node.get_content())  # Same content-hash ids as the eager path
+                if node.id_ in seen:
+                    continue
+                seen[node.id_] = None
+                if node.id_ not in known:
+                    new_nodes.append(node)
+            if new_nodes:
+                embeddings = self.embedding_model.get_text_embedding_batch(
+                    [node.get_content(metadata_mode=MetadataMode.EMBED) for node in new_nodes]
+                )
+                for node, embedding in zip(new_nodes, embeddings):
+                    node.embedding = embedding
+                with self._write_lock:
+                    # Stale chunks are only known once the whole file has been read, so while a large
+                    # edited file streams in, queries can see old and new versions of it side by side
+                    self.vector_store.add(new_nodes)
+                embedded += len(new_nodes)
+            del batch, new_nodes, node  # Release this window before the generator reads the next one
+
+        stale = list(known - seen.keys())
+        with self._write_lock:
+            if stale:
+                self.vector_store.delete_nodes(node_ids=stale)
+            self.manifest.set_file(source, digest, list(seen))
+            self.manifest.save()
+        return {"embedded": embedded, "deleted": len(stale)}
+
+    # Step 4.2.4: Drop every chunk of files that were deleted
+    def _remove_files(self, sources):
+        deleted = 0
+        for source in sources:
+            stale = list(self.manifest.chunks(source))
+            if stale:
+                self.vector_store.delete_nodes(node_ids=stale)
+            self.manifest.remove_file(source)
+            deleted += len(stale)
+        return deleted
+
+    # Step 4.2.5: Fresh index object and query-cache generation over the (already updated) store
+    def _swap_query_engine(self):
+        index = VectorStoreIndex.from_vector_store(
+            vector_store=self.vector_store, embed_model=self.embedding_model
+        )
+        self.index, self.query_engine = index, self._make_query_engine(index)
+
+    # Step 4.2.6: Query engine whose retriever reads through the query cache of the current generation
+    def _make_query_engine(self, index):
+        generation = self.query_cache.new_generation()  # Results cached for the previous index are dropped
+        retriever = CachedRetriever(index, self.query_cache, generation, similarity_top_k=self.similarity_top_k)
+        node_postprocessors = [self.context_assembler] if self.context_assembler else []  # Runs between retrieval and synthesis
+        return RetrieverQueryEngine.from_args(retriever, llm=Settings.llm, node_postprocessors=node_postprocessors)
 
     # Step 4.3: Handle queries to the indexed data
     def query(self, prompt):
         if self.query_engine is None:
             raise RuntimeError("Index not built yet. Call build_index() first.")
-        return self.query_engine.query(prompt)  # Ask the LLM a question based on the indexed docs
+        query_engine = self.query_engine
+        # Key on the engine too so a query started before a rebuild is not shared after it
+        key = f"{id(query_engine)}:{flight_key(prompt, self.llm_model)}"
+        return self.flights.do(key, lambda: query_engine.query(prompt))  # Ask the LLM a question based on the indexed docs
+
+
+# Step 4.4: Expand a file or folder path into the list of files to index
+def list_files(data_path):
+    data_path = os.path.abspath(data_path)
+    if os.path.isfile(data_path):
+        return [data_path]
+    files = []
+    for root, _, names in os.walk(data_path):
+        for name in sorted(names):
+            if not name.startswith(".") and not name.endswith(("~", ".swp")):
+                files.append(os.path.join(root, name))
+    return sorted(files)
 
 
 # Step 5: Main function to run the indexing + watch loop
@@ -101,9 +364,9 @@ def main():
     indexer.build_index(data_path=DATA_DIR)
 
     # Step 5.3: Set up file watcher to rebuild index if the file changes
-    event_handler = DataDirWatcher(
-        lambda: indexer.build_index(data_path=DATA_DIR),  # Pass a callback function
-    )
+    # Events are debounced and coalesced; only the changed files are re-indexed, off the watchdog thread
+    rebuilds = RebuildQueue(indexer.update_files, debounce=1.0).start()
+    event_handler = DataDirWatcher(rebuilds.submit)
     observer = Observer()
     observer.schedule(event_handler=event_handler, path=DATA_DIR, recursive=True)  # Watch the file path
     observer.daemon = True
@@ -122,6 +385,7 @@ def main():
         print("\n[shutdown] Stopping watcher and exiting.")
         observer.stop()  # Stop watching
     observer.join()
+    rebuilds.stop()
 
 
 # Step 6: Entry point for script